@@ -0,0 +1,247 @@
+#
+# Informed Search Methods
+#
+# Solving constraint networks from asyncio code in a thread or process pool.
+#
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from . import scsp
+    from . import solvers
+except ImportError:  # Run from within the src folder
+    import scsp
+    import solvers
+
+
+class SharedCancellationToken(solvers.CancellationToken):
+    """
+    A CancellationToken backed by a multiprocessing Event (or a manager's proxy of
+    one), so it can be cancelled in one process and seen by a search in another.
+    """
+
+    def __init__(self, event):
+        self.event = event
+
+    def cancel(self):
+        self.event.set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+
+# The manager process holding the events of the tokens of new_shared_token
+_manager = None
+_manager_lock = threading.Lock()
+
+# Seconds a cancelled task waits for its search to stop before it gives up on it
+CANCEL_WAIT = 1.0
+
+
+def new_shared_token():
+    """
+    Returns a SharedCancellationToken on an event of a manager process, started on
+    first use and shared by all of them. Blocks while the manager starts, so
+    asyncio code calls it in an executor.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = multiprocessing.Manager()
+        return SharedCancellationToken(_manager.Event())
+
+
+def _solve(st, cn, token, var_order, val_order, max_nodes, timeout):
+    return solvers.solve(
+        st,
+        cn,
+        var_order,
+        val_order,
+        max_nodes=max_nodes,
+        timeout=timeout,
+        token=token,
+    )
+
+
+def _solve_instance(
+    st, template, domains, ac, bitset, ac_algorithm, token, max_nodes, timeout
+):
+    cn = scsp.make_constraint_network(template, domains, ac, bitset, ac_algorithm)
+    return _solve(
+        st,
+        cn,
+        token,
+        solvers.VariableOrdering.STATIC,
+        solvers.ValueOrdering.ASCENDING,
+        max_nodes,
+        timeout,
+    )
+
+
+async def _run_cancellable(executor, token, fn, *args):
+    # Runs fn(*args) in executor. If the awaiting task is cancelled the token is
+    # cancelled too and the task waits up to CANCEL_WAIT seconds for fn to return
+    # (a search notices within SearchLimits.CHECK_INTERVAL nodes) before it stops
+    future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        token.cancel()
+        await asyncio.wait([future], timeout=CANCEL_WAIT)
+        raise
+
+
+async def solve_async(
+    st,
+    cn,
+    executor=None,
+    token=None,
+    var_order=solvers.VariableOrdering.STATIC,
+    val_order=solvers.ValueOrdering.ASCENDING,
+    max_nodes=None,
+    timeout=None,
+):
+    """
+    Solve cn like solvers.solve in executor (by default the thread pool of the event
+    loop), without blocking the loop. A search in a thread gets a copy of cn, one in
+    a process pool its own pickled copy, so cn is left as it is and can be solved
+    by several tasks at once. Cancelling the awaiting task cancels the token and so
+    the search. The token defaults to a new CancellationToken, or with a
+    ProcessPoolExecutor to a new_shared_token, and must then be a
+    SharedCancellationToken for the search to see it.
+    Returns (assignment, nodes) like solvers.solve.
+    """
+    if isinstance(executor, ProcessPoolExecutor):
+        if token is None:
+            loop = asyncio.get_running_loop()
+            token = await loop.run_in_executor(None, new_shared_token)
+        assert isinstance(
+            token, SharedCancellationToken
+        ), 'A search in a process pool only sees a SharedCancellationToken'
+    else:
+        if token is None:
+            token = solvers.CancellationToken()
+        cn = cn.copy()
+    return await _run_cancellable(
+        executor,
+        token,
+        _solve,
+        st,
+        cn,
+        token,
+        var_order,
+        val_order,
+        max_nodes,
+        timeout,
+    )
+
+
+class AsyncSolver:
+    """
+    Runs many searches for asyncio code of one event loop in an executor, at most
+    max_concurrent of them at a time. A caller awaiting a search beyond that waits
+    for one of the others to finish before its network is even sent to the
+    executor, which keeps a flood of requests from piling up in it.
+    """
+
+    def __init__(self, executor=None, max_concurrent=4):
+        """
+        Constructor: executor is a ThreadPoolExecutor or ProcessPoolExecutor, by
+        default a thread pool with max_concurrent threads owned by the solver.
+        """
+        assert max_concurrent > 0
+        self.owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_concurrent)
+        self.executor = executor
+        self.max_concurrent = max_concurrent
+        self.semaphore = None  # Created in the event loop of the first search
+        self.manager = None  # Shares the cancellation tokens with a process pool
+        if isinstance(executor, ProcessPoolExecutor):
+            self.manager = multiprocessing.Manager()
+
+    def slot(self):
+        """
+        Returns the semaphore a search holds while it runs.
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self.semaphore
+
+    def new_token(self):
+        """
+        Returns a cancellation token the searches of the executor see.
+        """
+        if self.manager is None:
+            return solvers.CancellationToken()
+        return SharedCancellationToken(self.manager.Event())
+
+    async def solve(
+        self,
+        st,
+        cn,
+        var_order=solvers.VariableOrdering.STATIC,
+        val_order=solvers.ValueOrdering.ASCENDING,
+        max_nodes=None,
+        timeout=None,
+    ):
+        """
+        Solve cn like solve_async once fewer than max_concurrent searches run.
+        Returns (assignment, nodes) like solvers.solve.
+        """
+        async with self.slot():
+            return await solve_async(
+                st,
+                cn,
+                self.executor,
+                self.new_token(),
+                var_order,
+                val_order,
+                max_nodes,
+                timeout,
+            )
+
+    async def solve_instance(
+        self,
+        st,
+        template,
+        domains,
+        ac=False,
+        bitset=False,
+        ac_algorithm='ac3',
+        max_nodes=None,
+        timeout=None,
+    ):
+        """
+        Solve the instance of the NetworkTemplate template with the given domains,
+        building its network with scsp.make_constraint_network (with arc consistency
+        and a bitset network as ac, bitset and ac_algorithm say) in the executor.
+        Returns (assignment, nodes) like solvers.solve.
+        """
+        async with self.slot():
+            token = self.new_token()
+            return await _run_cancellable(
+                self.executor,
+                token,
+                _solve_instance,
+                st,
+                template,
+                domains,
+                ac,
+                bitset,
+                ac_algorithm,
+                token,
+                max_nodes,
+                timeout,
+            )
+
+    def close(self):
+        """
+        Shuts down the executor if the solver created it, and the token manager.
+        """
+        if self.owns_executor:
+            self.executor.shutdown()
+        if self.manager is not None:
+            self.manager.shutdown()
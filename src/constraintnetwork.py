@@ -4,8 +4,15 @@
 # A class for processing constraint networks.
 # You do not want to change anything in hee!
 #
+import copy
+import operator
+
+
 class ConstraintNetwork:
 
+    # Domains are stored as Python sets (see BitsetConstraintNetwork for the alternative)
+    bitset = False
+
     @staticmethod
     def ordered_pair( i, j):
         if i < j:
@@ -21,14 +28,59 @@ class ConstraintNetwork:
         self.constraints_all = []
         self.constraints = [ set() for _ in range(0,n) ]
         self.domains = [ set() for _ in range(0,n) ]
+        self.earlier_peers = None
+        self.adjacency = None
+        self.trail = []
+        self.trail_levels = []
+        self.template = None
+        self.alldiff_constraints = []
+        self.alldiff_of = [ [] for _ in range(0,n) ]
+
+    @classmethod
+    def from_template(cls, template, domains):
+        """
+        Returns a network with the given domains sharing the (immutable) constraints of
+        template, see NetworkTemplate. No constraints can be added to it.
+        """
+        assert len(domains) == template.num_vars
+        cn = cls(0)
+        cn.num_vars = template.num_vars
+        cn.constraints_all = template.constraints_all
+        cn.constraints = template.constraints
+        cn.earlier_peers = template.earlier_peers
+        cn.adjacency = template.adjacency
+        cn.template = template
+        cn.alldiff_constraints = template.alldiff_constraints
+        cn.alldiff_of = template.alldiff_of
+        cn.domains = [ None ] * template.num_vars
+        for i in range(template.num_vars):
+            cn.set_domain(i, domains[i])
+        return cn
+
+    def copy(self):
+        """
+        Returns a network with the same constraints and copies of the domains and the
+        trail, so it can be searched while this one is. The constraints of a template
+        network are shared, those added with add_*_constraint are copied.
+        """
+        cn = copy.copy(self)
+        cn.domains = [ copy.copy(d) for d in self.domains ]
+        cn.trail = list(self.trail)
+        cn.trail_levels = list(self.trail_levels)
+        if self.template is None:
+            cn.constraints_all = list(self.constraints_all)
+            cn.constraints = [ set(c) for c in self.constraints ]
+            cn.alldiff_constraints = list(self.alldiff_constraints)
+            cn.alldiff_of = [ list(a) for a in self.alldiff_of ]
+        return cn
 
     def __str__(self):
         """
         Enables us to print the network or get as a string.
         """
         s = ''
-        for d in self.domains:
-            s += str(d) + '\n'
+        for i in range(self.num_vars):
+            s += str(self.get_domain(i)) + '\n'
         for c in self.constraints_all:
             s += str(c) + ' '
         return s
@@ -53,6 +105,13 @@ class ConstraintNetwork:
         assert 0 <= i < self.num_vars
         return self.domains[i]
 
+    def domain_size(self, i):
+        """
+        Returns the number of values in the domain of variable i.
+        """
+        assert 0 <= i < self.num_vars
+        return len(self.domains[i])
+
     def get_sorted_domain(self, i):
         """
         Returns a sorted *copy* of the domain of variable i as a list.
@@ -60,6 +119,50 @@ class ConstraintNetwork:
         assert 0 <= i < self.num_vars
         return sorted( self.get_domain(i) )
 
+    def push_level(self):
+        """
+        Starts a new level on the trail, pop_level undoes every removal made after it.
+        """
+        self.trail_levels.append(len(self.trail))
+
+    def remove_value(self, i, v):
+        """
+        Removes value v from the domain of variable i and records it on the trail.
+        Returns True if the value was in the domain, otherwise False.
+        """
+        domain = self.domains[i]
+        if v in domain:
+            domain.remove(v)
+            self.trail.append((i, v))
+            return True
+        return False
+
+    def assign_value(self, i, v):
+        """
+        Reduces the domain of variable i to {v}, recording the removed values on the trail.
+        """
+        for w in self.get_sorted_domain(i):
+            if w != v:
+                self.remove_value(i, w)
+
+    def pop_level(self):
+        """
+        Restores all values removed since the matching push_level.
+        """
+        assert self.trail_levels
+        mark = self.trail_levels.pop()
+        trail = self.trail
+        domains = self.domains
+        while len(trail) > mark:
+            (i, v) = trail.pop()
+            domains[i].add(v)
+
+    def num_levels(self):
+        """
+        Returns the number of levels currently on the trail.
+        """
+        return len(self.trail_levels)
+
     def add_ne_constraint(self, i, j):
         """
         Adds a not-equal constraint between variables i and j.
@@ -67,12 +170,85 @@ class ConstraintNetwork:
         assert 0 <= i < self.num_vars
         assert 0 <= j < self.num_vars
         assert i != j
+        assert self.template is None, 'constraints of a template network are frozen'
         ( i, j ) = self.ordered_pair(i, j)
         self.constraints_all.append((i, j))
         self.constraints[i].add(j)
         self.constraints[j].add(i)
+        self.earlier_peers = None
+        self.adjacency = None
         return
 
+    def add_alldiff_constraint(self, scope):
+        """
+        Adds an AllDifferent constraint over the variables in scope. The not-equal
+        constraints between every pair of them are added too (unless already there),
+        so solvers checking pairs of variables need not know about it.
+        """
+        scope = tuple(sorted(scope))
+        assert len(scope) == len(set(scope))
+        assert all(0 <= i < self.num_vars for i in scope)
+        assert self.template is None, 'constraints of a template network are frozen'
+        for a in range(len(scope)):
+            for b in range(a + 1, len(scope)):
+                if scope[b] not in self.constraints[scope[a]]:
+                    self.add_ne_constraint(scope[a], scope[b])
+        for i in scope:
+            self.alldiff_of[i].append(len(self.alldiff_constraints))
+        self.alldiff_constraints.append(scope)
+
+    def get_alldiff_constraints(self):
+        """
+        Returns a list of the scopes (sorted tuples of variables) of all AllDifferent constraints.
+        """
+        return self.alldiff_constraints
+
+    def get_alldiff_constraints_with(self, i):
+        """
+        Returns the indices, in get_alldiff_constraints, of the AllDifferent constraints on variable i.
+        """
+        assert 0 <= i < self.num_vars
+        return self.alldiff_of[i]
+
+    def finalize(self):
+        """
+        Builds for each variable i the sorted list of variables j<i constrained with it,
+        and the adjacency matrix of the constraints, a flat bytearray where entry i*n+j
+        is 1 if there is a constraint between variables i and j, otherwise 0.
+        Adding a constraint afterwards discards both.
+        """
+        n = self.num_vars
+        self.earlier_peers = [ sorted(j for j in self.constraints[i] if j < i) for i in range(n) ]
+        adjacency = bytearray(n * n)
+        for (i, j) in self.constraints_all:
+            adjacency[i * n + j] = 1
+            adjacency[j * n + i] = 1
+        self.adjacency = adjacency
+
+    def get_adjacency(self):
+        """
+        Returns the adjacency matrix of the constraints (see finalize), building it if needed.
+        """
+        if self.adjacency is None:
+            self.finalize()
+        return self.adjacency
+
+    def constrained(self, i, j):
+        """
+        Returns True if there is a constraint between variables i and j. Unlike the
+        consistent* methods below it does no bounds checking.
+        """
+        return self.get_adjacency()[i * self.num_vars + j] == 1
+
+    def get_earlier_peers(self, i):
+        """
+        Returns the sorted list of variables j<i sharing a constraint with variable i.
+        """
+        assert 0 <= i < self.num_vars
+        if self.earlier_peers is None:
+            self.finalize()
+        return self.earlier_peers[i]
+
     def get_constraints(self):
         """
         Returns a list of all constraints.
@@ -96,6 +272,16 @@ class ConstraintNetwork:
         assert i != j
         return j not in self.constraints[i] or vi != vj
 
+    def check_values(self, i, j):
+        """
+        Returns a function f(vi, vj) that is consistent_values(i, j, vi, vj), with the
+        constraint between variables i and j looked up once in the adjacency matrix and
+        no bounds checking, for the inner loops of arc consistency.
+        """
+        if self.get_adjacency()[i * self.num_vars + j]:
+            return operator.ne
+        return lambda vi, vj: True
+
     def consistent(self, i, j, A):
         """
         Returns True if there is no constraint between variables i and j violated by their current assignment,
@@ -128,3 +314,161 @@ class ConstraintNetwork:
             if not self.consistent_other(i, A):
                 return False
         return True
+
+
+class NetworkTemplate:
+    """
+    An immutable constraint graph over n variables, built once from a list of not-equal
+    and AllDifferent constraints and shared by every network instantiated from it.
+    """
+
+    def __init__(self, n, constraints):
+        """
+        Constructor: n is the number of variables, constraints a list of pairs (i, j)
+        for not-equal constraints and longer tuples for AllDifferent constraints.
+        """
+        cn = ConstraintNetwork(n)
+        for c in constraints:
+            if len(c) == 2:
+                cn.add_ne_constraint(c[0], c[1])
+            else:
+                cn.add_alldiff_constraint(c)
+        cn.finalize()
+        self.num_vars = n
+        self.constraints_all = tuple(cn.constraints_all)
+        self.constraints = tuple(frozenset(c) for c in cn.constraints)
+        self.earlier_peers = tuple(tuple(p) for p in cn.earlier_peers)
+        self.adjacency = bytes(cn.adjacency)
+        self.alldiff_constraints = tuple(cn.alldiff_constraints)
+        self.alldiff_of = tuple(tuple(a) for a in cn.alldiff_of)
+
+    def instantiate(self, domains, network=ConstraintNetwork):
+        """
+        Returns a network of class network (e.g. BitsetConstraintNetwork) with the
+        given domains and the constraints of this template.
+        """
+        return network.from_template(self, domains)
+
+
+class BitsetConstraintNetwork(ConstraintNetwork):
+    """
+    A constraint network storing each domain as a single integer, where bit v is set
+    if and only if value v is in the domain. Values must be non-negative integers.
+    """
+
+    bitset = True
+
+    @staticmethod
+    def mask_from_values(values):
+        """
+        Returns the bitset holding the given values.
+        """
+        mask = 0
+        for v in values:
+            mask |= 1 << v
+        return mask
+
+    @staticmethod
+    def values_from_mask(mask):
+        """
+        Returns the values of a bitset as an ascending list (lowest-bit iteration).
+        """
+        values = []
+        while mask:
+            low = mask & -mask
+            values.append(low.bit_length() - 1)
+            mask ^= low
+        return values
+
+    @staticmethod
+    def popcount(mask):
+        """
+        Returns the number of values in a bitset.
+        """
+        return bin(mask).count('1')
+
+    def __init__(self, n):
+        """
+        Constructor: n is the number of variables the constraint network should have.
+        """
+        super().__init__(n)
+        self.domains = [ 0 for _ in range(0,n) ]
+
+    def set_domain(self, i, domain):
+        """
+        Sets the domain of variable i from a collection of values.
+        """
+        assert 0 <= i < self.num_vars
+        self.domains[i] = self.mask_from_values(domain)
+
+    def get_domain(self, i):
+        """
+        Returns the domain of variable i as a set (a *copy*, use set_domain_mask to mutate).
+        """
+        assert 0 <= i < self.num_vars
+        return set(self.values_from_mask(self.domains[i]))
+
+    def get_domain_mask(self, i):
+        """
+        Returns the domain of variable i as a bitset.
+        """
+        assert 0 <= i < self.num_vars
+        return self.domains[i]
+
+    def set_domain_mask(self, i, mask):
+        """
+        Sets the domain of variable i to the given bitset.
+        """
+        assert 0 <= i < self.num_vars
+        self.domains[i] = mask
+
+    def domain_size(self, i):
+        """
+        Returns the number of values in the domain of variable i.
+        """
+        assert 0 <= i < self.num_vars
+        return self.popcount(self.domains[i])
+
+    def get_sorted_domain(self, i):
+        """
+        Returns the domain of variable i as an ascending list (no sorting required).
+        """
+        assert 0 <= i < self.num_vars
+        return self.values_from_mask(self.domains[i])
+
+    def remove_value(self, i, v):
+        """
+        Removes value v from the domain of variable i and records it on the trail.
+        Returns True if the value was in the domain, otherwise False.
+        """
+        return self.remove_mask(i, 1 << v)
+
+    def assign_value(self, i, v):
+        """
+        Reduces the domain of variable i to {v}, recording the removed values on the trail.
+        """
+        self.remove_mask(i, ~(1 << v))
+
+    def remove_mask(self, i, mask):
+        """
+        Removes all values in the bitset mask from the domain of variable i and records
+        them on the trail. Returns True if any value was in the domain, otherwise False.
+        """
+        removed = self.domains[i] & mask
+        if removed:
+            self.domains[i] ^= removed
+            self.trail.append((i, removed))
+            return True
+        return False
+
+    def pop_level(self):
+        """
+        Restores all values removed since the matching push_level.
+        """
+        assert self.trail_levels
+        mark = self.trail_levels.pop()
+        trail = self.trail
+        domains = self.domains
+        while len(trail) > mark:
+            (i, removed) = trail.pop()
+            domains[i] |= removed
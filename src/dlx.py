@@ -0,0 +1,159 @@
+#
+# Informed Search Methods
+#
+# Exact cover solver using Algorithm X with dancing links, and its use on Sudoku.
+#
+
+try:
+    from . import sudoku
+except ImportError:  # Run from within the src folder
+    import sudoku
+
+
+class DancingLinks:
+    """
+    The sparse 0/1 matrix of an exact cover problem as circular doubly linked lists.
+    Node 0 is the root, nodes 1 to num_columns the column headers and the rest the
+    1s of the matrix, all stored in flat lists indexed by node.
+    """
+
+    def __init__(self, num_columns, rows):
+        """
+        Constructor: rows is a list of lists of the column indices (0-based) each row
+        covers.
+        """
+        n = num_columns + 1
+        self.left = [i - 1 for i in range(n)]
+        self.right = [i + 1 for i in range(n)]
+        self.left[0], self.right[-1] = num_columns, 0
+        self.up = list(range(n))
+        self.down = list(range(n))
+        self.column = list(range(n))
+        self.size = [0] * n
+        self.row = [-1] * n
+
+        for r, columns in enumerate(rows):
+            first = None
+            for c in columns:
+                c += 1
+                node = len(self.column)
+                # Append the node at the bottom of column c
+                self.up.append(self.up[c])
+                self.down.append(c)
+                self.down[self.up[c]] = node
+                self.up[c] = node
+                self.column.append(c)
+                self.row.append(r)
+                self.size[c] += 1
+                # And at the end of its row
+                if first is None:
+                    first = node
+                    self.left.append(node)
+                    self.right.append(node)
+                else:
+                    self.left.append(self.left[first])
+                    self.right.append(first)
+                    self.right[self.left[first]] = node
+                    self.left[first] = node
+
+    def cover(self, c):
+        """
+        Removes column c and every row covering it from the matrix.
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        """
+        Undoes cover(c), must be called in the reverse order of the covers.
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def search(self):
+        """
+        Searches for an exact cover, always branching on the column with the fewest
+        rows. Returns a tuple (rows, nodes), where the former lists the indices of the
+        chosen rows (an empty list if there is no cover) and the latter the number of
+        nodes generated. The matrix is left covered if a solution is found.
+        """
+        right, down, column, size = self.right, self.down, self.column, self.size
+        solution = []
+        num_nodes = 0
+
+        def X():
+            nonlocal num_nodes
+            num_nodes += 1
+
+            # All columns covered
+            if right[0] == 0:
+                return True
+
+            # Choose the column with the fewest rows
+            c = best = right[0]
+            while c != 0:
+                if size[c] < size[best]:
+                    best = c
+                c = right[c]
+
+            self.cover(best)
+            r = down[best]
+            while r != best:
+                solution.append(self.row[r])
+                j = right[r]
+                while j != r:
+                    self.cover(column[j])
+                    j = right[j]
+
+                if X():
+                    return True
+
+                j = self.left[r]
+                while j != r:
+                    self.uncover(column[j])
+                    j = self.left[j]
+                solution.pop()
+                r = down[r]
+            self.uncover(best)
+            return False
+
+        X()
+        return (solution, num_nodes)
+
+
+def solve_puzzle(puzzle):
+    """
+    Solves a puzzle as read by sudoku.read_puzzles (81 digits, 0 for an empty cell).
+    Returns a tuple (assignment, nodes) like solvers.solve.
+    """
+    rows = sudoku.generate_cover_rows(puzzle)
+    (chosen, nodes) = DancingLinks(324, [columns for (_, _, columns) in rows]).search()
+    if not chosen:
+        return ([], nodes)
+    assignment = [0] * 81
+    for r in chosen:
+        (cell, digit, _) = rows[r]
+        assignment[cell] = digit
+    return (assignment, nodes)
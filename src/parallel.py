@@ -0,0 +1,280 @@
+#
+# Informed Search Methods
+#
+# Solving constraint networks in parallel over a pool of worker processes.
+#
+import multiprocessing
+import os
+import queue
+import random
+import traceback
+from collections import deque, namedtuple
+
+try:
+    from . import solvers
+except ImportError:  # Run from within the src folder
+    import solvers
+
+
+# A solver configuration of a portfolio, with a seed the values are tried in a random
+# order and the ties of the variable ordering broken at random (see solvers.solve)
+Configuration = namedtuple(
+    'Configuration',
+    ['st', 'var_order', 'val_order', 'seed'],
+    defaults=[solvers.VariableOrdering.STATIC, solvers.ValueOrdering.ASCENDING, None],
+)
+
+
+def run_configuration(cn, config):
+    """
+    Solve cn with the configuration config. Returns (assignment, nodes) like
+    solvers.solve.
+    """
+    rng = None if config.seed is None else random.Random(config.seed)
+    return solvers.solve(config.st, cn, config.var_order, config.val_order, rng=rng)
+
+
+def _portfolio_worker(job):
+    (index, cn, config) = job
+    return (index,) + run_configuration(cn, config)
+
+
+def solve_portfolio(cn, configs, processes=None):
+    """
+    Solve cn with all the configurations in configs at the same time, each in a
+    process of a pool of the given size (by default one per configuration, with
+    fewer the rest wait for a free process). The first configuration to finish wins
+    and the processes still running the others are terminated. Each worker solves
+    its own copy of cn.
+    Returns (config, assignment, nodes) of the winning configuration.
+    """
+    assert configs
+    jobs = [(index, cn, config) for index, config in enumerate(configs)]
+    with multiprocessing.Pool(processes or len(configs)) as pool:
+        # Leaving the block terminates the pool
+        (index, assignment, nodes) = next(pool.imap_unordered(_portfolio_worker, jobs))
+    return (configs[index], assignment, nodes)
+
+
+def extend_prefix(cn, prefix):
+    """
+    Returns the assignments of the variables up to len(prefix) that extend the
+    assignment prefix of the first variables consistently, in ascending order.
+    """
+    i = len(prefix)
+    peers = cn.get_earlier_peers(i)
+    return [
+        prefix + [v]
+        for v in cn.get_sorted_domain(i)
+        if all(prefix[j] != v for j in peers)
+    ]
+
+
+def split_prefixes(cn, min_prefixes):
+    """
+    Fixes the values of the first variables, one more at a time until there are at
+    least min_prefixes consistent assignments of them (or all variables are fixed).
+    Returns (prefixes, nodes), the assignments in the order BT visits them and the
+    number of nodes BT expands to find them.
+    """
+    prefixes = [[]]
+    nodes = 0
+    for _ in range(cn.num_variables()):
+        if len(prefixes) >= min_prefixes:
+            break
+        nodes += len(prefixes)
+        prefixes = [p for prefix in prefixes for p in extend_prefix(cn, prefix)]
+    return (prefixes, nodes)
+
+
+def solve_prefix(st, cn, prefix):
+    """
+    Solve cn with the solver type st (with static ordering) given the values prefix
+    of the first variables. Returns (assignment, nodes) like solvers.solve, where the
+    nodes of the fixed variables are not counted.
+    """
+    cn.push_level()
+    for i, v in enumerate(prefix):
+        cn.assign_value(i, v)
+    (assignment, nodes) = solvers.solve(st, cn)
+    cn.pop_level()
+    return (assignment, max(nodes - len(prefix), 0))
+
+
+def untried_prefixes(cn, A, start):
+    """
+    Returns the subproblems a search with static ordering and ascending values,
+    which started from the values A[:start] of the first variables, has yet to try
+    once it reaches the node A: the assignments of A[:k] extended by a later
+    consistent value of variable k, for k from len(A)-1 down to start, in the order
+    BT visits them.
+    """
+    return [
+        p
+        for k in reversed(range(start, len(A)))
+        for p in extend_prefix(cn, A[:k])
+        if p[k] > A[k]
+    ]
+
+
+def _claim_idle(idle):
+    # Takes one idle worker for a subproblem about to be given away, so several
+    # busy workers do not all give one to the same idle worker
+    with idle.get_lock():
+        if idle.value > 0:
+            idle.value -= 1
+            return True
+    return False
+
+
+def _search_prefix(st, cn, prefix, nodes_per_step, idle, stop):
+    # Solve cn given the values prefix of the first variables, nodes_per_step nodes
+    # at a time. Returns (assignment, nodes, rest), where rest is the list of
+    # subproblems left if the search was given up to split it for an idle worker
+    # (or empty if another worker found a solution), otherwise None. The nodes of the
+    # fixed variables, and of a node left in rest, are not counted.
+    L = len(prefix)
+    cn.push_level()
+    for i, v in enumerate(prefix):
+        cn.assign_value(i, v)
+    steps = solvers.solve_steps(st, cn, nodes_per_step)
+    try:
+        for snapshot in steps:
+            if snapshot.status is not None:
+                return (snapshot.assignment or [], max(snapshot.nodes - L, 0), None)
+            if stop.is_set():
+                return (None, snapshot.nodes - L, [])
+            if idle.value > 0 and L <= snapshot.depth < cn.num_variables():
+                # The subtree of the node A is still to be searched, and so are the
+                # untried values of the variables on the way to it
+                A = snapshot.assignment
+                rest = untried_prefixes(cn, A, L)
+                if rest:
+                    return (None, snapshot.nodes - L - 1, [A] + rest)
+                rest = extend_prefix(cn, A)
+                if len(rest) > 1:
+                    return (None, snapshot.nodes - L, rest)
+    finally:
+        steps.close()
+        cn.pop_level()
+
+
+def _steal_and_search(st, cn, prefixes, nodes_per_step, shared):
+    (steal_queue, results, idle, pending, total_nodes, stop) = shared
+
+    # The subproblems of the worker, the next one at the end and the shallowest,
+    # largest ones first
+    local = deque(reversed(prefixes))
+    while not stop.is_set():
+        if not local:
+            # Out of work, wait for a busy worker to give up a subproblem
+            with idle.get_lock():
+                idle.value += 1
+            prefix = None
+            while prefix is None and pending.value > 0 and not stop.is_set():
+                try:
+                    prefix = steal_queue.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+            if prefix is None:
+                # Nobody claimed the worker (unless it is stopping anyway)
+                with idle.get_lock():
+                    idle.value -= 1
+                return None
+            local.append(prefix)
+
+        # Give the oldest subproblems to idle workers
+        while len(local) > 1 and _claim_idle(idle):
+            steal_queue.put(local.popleft())
+
+        prefix = local.pop()
+        (assignment, nodes, rest) = _search_prefix(
+            st, cn, prefix, nodes_per_step, idle, stop
+        )
+        with total_nodes.get_lock():
+            total_nodes.value += nodes
+        with pending.get_lock():
+            pending.value += len(rest) - 1 if rest is not None else -1
+        if rest:
+            local.extend(reversed(rest))
+        elif assignment:
+            stop.set()
+            return assignment
+    return None
+
+
+def _tree_search_worker(st, cn, prefixes, nodes_per_step, shared):
+    # Always reports to the main process, with the traceback if the search failed
+    (solution, error) = (None, None)
+    try:
+        solution = _steal_and_search(st, cn, prefixes, nodes_per_step, shared)
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        shared[1].put((solution, error))
+
+
+def solve_parallel(st, cn, workers=None, split=4, nodes_per_step=1000):
+    """
+    Solve cn with the solver type st (BT, BJ or CBJ, or their explicit stack
+    versions) in worker processes (by default one per CPU). The tree is split into
+    subproblems by fixing the values of the first variables (see split_prefixes),
+    at least split per worker, which are dealt out to the workers. A worker out of
+    subproblems is given the oldest one of a busy worker. A worker with none to
+    spare checks every nodes_per_step nodes of its running search whether another
+    one is idle, and if so stops it and splits what is left of it (see
+    untried_prefixes) without losing any of the nodes already searched. Once one of
+    them finds a solution the others are terminated.
+    Returns (assignment, nodes) like solvers.solve, where nodes is summed over the
+    workers, not counting the subproblems they were searching when terminated.
+    Raises RuntimeError if a worker fails or dies.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    (prefixes, nodes) = split_prefixes(cn, workers * split)
+    if not prefixes:
+        return ([], nodes)
+    shared = (
+        multiprocessing.Queue(),
+        multiprocessing.Queue(),
+        multiprocessing.Value('i', 0),
+        multiprocessing.Value('i', len(prefixes)),
+        multiprocessing.Value('q', 0),
+        multiprocessing.Event(),
+    )
+    processes = [
+        multiprocessing.Process(
+            target=_tree_search_worker,
+            args=(st, cn, prefixes[w::workers], nodes_per_step, shared),
+        )
+        for w in range(workers)
+    ]
+    for p in processes:
+        p.start()
+
+    # Every worker reports once, the first solution ends the search
+    solution = []
+    try:
+        for _ in processes:
+            (assignment, error) = _next_report(shared[1], processes)
+            if error is not None:
+                raise RuntimeError('A worker process failed:\n' + error)
+            if assignment is not None:
+                solution = assignment
+                break
+    finally:
+        for p in processes:
+            p.terminate()
+            p.join()
+    # The workers are gone, so the counter is read without its lock
+    return (solution, nodes + shared[4].get_obj().value)
+
+
+def _next_report(results, processes):
+    # A worker exiting on an error reports it, one killed before it could cannot
+    while True:
+        try:
+            return results.get(timeout=0.1)
+        except queue.Empty:
+            if any(p.exitcode not in (None, 0) for p in processes):
+                raise RuntimeError('A worker process died')
@@ -0,0 +1,321 @@
+#
+# Informed Search Methods
+#
+# SAT encoding of constraint networks and a CDCL solver for it.
+#
+
+
+def luby(k):
+    """
+    Returns the k-th element (1-based) of the Luby sequence 1,1,2,1,1,2,4,1,1,2,...
+    """
+    while True:
+        power = 1
+        while (1 << power) - 1 < k:
+            power += 1
+        if (1 << power) - 1 == k:
+            return 1 << (power - 1)
+        k -= (1 << (power - 1)) - 1
+
+
+class CDCLSolver:
+    """
+    A conflict-driven clause learning SAT solver with two watched literals, first-UIP
+    clause learning, VSIDS decisions with phase saving and Luby restarts.
+    Variables are numbered 1 to num_vars and a literal is k or -k for variable k.
+    """
+
+    RESTART_BASE = 100  # Conflicts per unit of the Luby sequence
+    VAR_DECAY = 0.95
+
+    def __init__(self, num_vars):
+        """
+        Constructor: num_vars is the number of boolean variables.
+        """
+        self.num_vars = num_vars
+        self.clauses = []
+        self.watches = [[] for _ in range(2 * num_vars + 2)]
+        self.value = [0] * (num_vars + 1)  # 1 true, -1 false, 0 unassigned
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.phase = [1] * (num_vars + 1)
+        self.var_inc = 1.0
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.ok = True  # False once the clauses are known to be unsatisfiable
+        self.num_decisions = 0
+        self.num_conflicts = 0
+
+    @staticmethod
+    def watch_index(lit):
+        return 2 * lit if lit > 0 else 1 - 2 * lit
+
+    def lit_value(self, lit):
+        v = self.value[lit if lit > 0 else -lit]
+        return v if lit > 0 else -v
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def add_clause(self, lits):
+        """
+        Adds a clause, a list of literals. Must be called before solve or at
+        decision level 0.
+        """
+        lits = list(dict.fromkeys(lits))
+        if any(-lit in lits for lit in lits):
+            return
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            v = self.lit_value(lits[0])
+            if v < 0:
+                self.ok = False
+            elif v == 0:
+                self.enqueue(lits[0], None)
+        else:
+            self.attach(lits)
+
+    def attach(self, lits):
+        ci = len(self.clauses)
+        self.clauses.append(lits)
+        self.watches[self.watch_index(lits[0])].append(ci)
+        self.watches[self.watch_index(lits[1])].append(ci)
+        return ci
+
+    def enqueue(self, lit, reason):
+        var = lit if lit > 0 else -lit
+        self.value[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Unit propagation over the watched literals. Returns the index of a
+        conflicting clause, or None.
+        """
+        clauses, watches = self.clauses, self.watches
+        lit_value, watch_index = self.lit_value, self.watch_index
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            wi = watch_index(false_lit)
+            ws = watches[wi]
+            kept = []
+            for k, ci in enumerate(ws):
+                c = clauses[ci]
+
+                # Make sure the false literal is c[1]
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], c[0]
+
+                # Satisfied by the other watch
+                if lit_value(c[0]) == 1:
+                    kept.append(ci)
+                    continue
+
+                # Look for a new literal to watch
+                for m in range(2, len(c)):
+                    if lit_value(c[m]) != -1:
+                        c[1], c[m] = c[m], c[1]
+                        watches[watch_index(c[1])].append(ci)
+                        break
+                else:
+                    kept.append(ci)
+                    if lit_value(c[0]) == -1:
+                        kept.extend(ws[k + 1:])
+                        watches[wi] = kept
+                        return ci
+                    self.enqueue(c[0], ci)
+            watches[wi] = kept
+        return None
+
+    def bump(self, var):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+
+    def analyze(self, confl):
+        """
+        Derives the first-UIP clause of a conflict. Returns the learnt clause, with the
+        asserting literal first and a literal of the backjump level second, and the
+        level to backjump to.
+        """
+        seen = [False] * (self.num_vars + 1)
+        learnt = [0]
+        counter = 0
+        p = None
+        index = len(self.trail) - 1
+        current = self.decision_level()
+        c = self.clauses[confl]
+        while True:
+            for q in c if p is None else c[1:]:
+                var = q if q > 0 else -q
+                if not seen[var] and self.level[var] > 0:
+                    seen[var] = True
+                    self.bump(var)
+                    if self.level[var] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+
+            # The next literal of the current level on the trail to resolve on
+            while not seen[abs(self.trail[index])]:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            c = self.clauses[self.reason[abs(p)]]
+        learnt[0] = -p
+
+        if len(learnt) == 1:
+            return learnt, 0
+        best = max(range(1, len(learnt)), key=lambda k: self.level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def backtrack(self, level):
+        """
+        Undoes all assignments above the given decision level.
+        """
+        if self.decision_level() <= level:
+            return
+        mark = self.trail_lim[level]
+        for lit in self.trail[mark:]:
+            var = lit if lit > 0 else -lit
+            self.phase[var] = self.value[var]
+            self.value[var] = 0
+            self.reason[var] = None
+        del self.trail[mark:]
+        del self.trail_lim[level:]
+        self.qhead = mark
+
+    def block(self, lits):
+        """
+        Excludes the model given by the true literals lits by adding the clause of
+        their negations, so solve goes on to the next model. Returns False if the
+        clauses are then known to be unsatisfiable.
+        """
+        self.backtrack(0)
+        self.add_clause([-lit for lit in lits if self.lit_value(lit) == 0])
+        return self.ok
+
+    def pick_branch_var(self):
+        best, best_activity = 0, -1.0
+        for var in range(1, self.num_vars + 1):
+            if self.value[var] == 0 and self.activity[var] > best_activity:
+                best, best_activity = var, self.activity[var]
+        return best
+
+    def solve(self, max_decisions=None, stop=None):
+        """
+        Returns True if the clauses are satisfiable, with the model in value,
+        otherwise False. With max_decisions it gives up, returning None, before
+        making more decisions than that, and with stop (a function) before any
+        decision for which it returns True.
+        """
+        if not self.ok:
+            return False
+        restarts = 1
+        conflicts_left = self.RESTART_BASE * luby(restarts)
+        while True:
+            confl = self.propagate()
+            if confl is not None:
+                self.num_conflicts += 1
+                conflicts_left -= 1
+                if self.decision_level() == 0:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(confl)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt))
+                self.var_inc /= self.VAR_DECAY
+                continue
+
+            if conflicts_left <= 0:
+                restarts += 1
+                conflicts_left = self.RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            var = self.pick_branch_var()
+            if not var:
+                return True
+            if self.num_decisions == max_decisions or (stop is not None and stop()):
+                return None
+            self.num_decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] > 0 else -var, None)
+
+
+def encode(cn):
+    """
+    Encodes the constraint network cn with one boolean variable per (variable, value)
+    pair. Returns the solver holding the at-least-one, at-most-one and not-equal
+    clauses and a list mapping each value v of D_i to its boolean variable, for all i.
+    """
+    literals = []
+    num_bools = 0
+    for i in range(cn.num_variables()):
+        values = cn.get_sorted_domain(i)
+        literals.append({v: num_bools + 1 + k for k, v in enumerate(values)})
+        num_bools += len(values)
+
+    solver = CDCLSolver(num_bools)
+    for lits in literals:
+        # At least one value
+        solver.add_clause(list(lits.values()))
+        # At most one value
+        bools = list(lits.values())
+        for a in range(len(bools)):
+            for b in range(a + 1, len(bools)):
+                solver.add_clause([-bools[a], -bools[b]])
+    # Not-equal constraints
+    for (i, j) in cn.get_constraints():
+        for v, b in literals[i].items():
+            if v in literals[j]:
+                solver.add_clause([-b, -literals[j][v]])
+    return solver, literals
+
+
+def solve_network(cn, max_decisions=None, rng=None, on_solution=None, stop=None):
+    """
+    Solves the constraint network cn with the CDCL solver. Returns a tuple
+    (assignment, nodes) like solvers.solve, where nodes is the number of decisions
+    and the assignment is None if the solver gave up after max_decisions or when
+    stop returned True (see CDCLSolver.solve).
+    With rng (a random.Random) the initial activities get a small random part, so
+    ties between the decision variables are broken at random.
+    With on_solution each solution is passed to it and blocked, so the solver goes
+    on to the next one unless it returns True.
+    """
+    solver, literals = encode(cn)
+    if rng is not None:
+        solver.activity = [rng.random() * 1e-3 for _ in solver.activity]
+    while True:
+        solved = solver.solve(max_decisions, stop)
+        if solved is None:
+            return (None, solver.num_decisions)
+        if not solved:
+            return ([], solver.num_decisions)
+        model = [
+            next(b for b in lits.values() if solver.value[b] > 0) for lits in literals
+        ]
+        assignment = [
+            next(v for v, b in lits.items() if solver.value[b] > 0)
+            for lits in literals
+        ]
+        if on_solution is None or on_solution(list(assignment)):
+            return (assignment, solver.num_decisions)
+        if not solver.block(model):
+            return ([], solver.num_decisions)
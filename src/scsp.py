@@ -6,11 +6,18 @@
 #
 #
 import argparse
+import concurrent.futures
+import os
 import re
-import constraintnetwork
-import solvers
 from timeit import default_timer as timer
 
+try:
+    from . import constraintnetwork, solvers, strategies
+except ImportError:  # Run from within the src folder
+    import constraintnetwork
+    import solvers
+    import strategies
+
 def log_string( str ):
     with open( 'output.txt', 'a' ) as f:
         f.write(str)
@@ -50,77 +57,214 @@ def read_binary_constraints( name ):
                 c = []
                 for match in iterator:
                     c.append(int(match.group()))
-                assert len(c) == 2
-                constraints.append((c[0], c[1]))
+                assert len(c) >= 2  # More than two variables for AllDifferent
+                constraints.append(tuple(c))
     except FileNotFoundError:
         print("File", "'" + name + "'", "not found.")
     return constraints
 
 
-def make_constraint_network(constraints, domains, ac):
-    csp = constraintnetwork.ConstraintNetwork( len(domains) )
-    for c in constraints:
-        csp.add_ne_constraint(c[0],c[1])
-    for i in range(len(domains)):
-        csp.set_domain(i, domains[i])
-    if ac:
+def make_network_template(constraints, instances):
+    if not instances:
+        return None
+    return constraintnetwork.NetworkTemplate( len(instances[0]), constraints )
+
+
+def make_constraint_network(template, domains, ac, bitset=False, ac_algorithm='ac3'):
+    if bitset:
+        csp = template.instantiate(domains, constraintnetwork.BitsetConstraintNetwork)
+    else:
+        csp = template.instantiate(domains)
+    if ac and ac_algorithm == 'ac2001':
+        solvers.make_arc_consistent_2001(csp)
+    elif ac and ac_algorithm == 'ne':
+        solvers.make_arc_consistent_ne(csp)
+    elif ac and ac_algorithm == 'alldiff':
+        solvers.make_arc_consistent_alldiff(csp)
+    elif ac and ac_algorithm == 'strategies':
+        (_, fired) = strategies.apply_strategies(csp)
+        print('Rules fired:', ', '.join(rule + ' ' + str(n) for rule, n in fired.items() if n))
+    elif ac:
         solvers.make_arc_consistent(csp)
     return csp
 
 
+def run_solver(solver_type, csp, args):
+    """
+    Solves csp with solver_type as the command-line arguments args say.
+    Returns (solution, nodes), where solution is the number of solutions when counting
+    and the status of the search if no solution was found.
+    """
+    variable_ordering = solvers.VariableOrdering[args['order'].upper().replace('-', '_')]
+    value_ordering = solvers.ValueOrdering[args['values'].upper()]
+    nogood_capacity = args['nogoods']
+    restarts = args['restarts']
+    restart_base = args['restart_base']
+    seed = args['seed']
+    count_limit = args['count']
+    max_nodes = args['max_nodes']
+    timeout = args['timeout']
+    if count_limit is not None:
+        limit = count_limit if count_limit > 0 else None
+        if solver_type in (solvers.SolverType.BT, solvers.SolverType.BJ, solvers.SolverType.CBJ):
+            (count, nodes) = solvers.count_solutions(solver_type, csp, limit, variable_ordering, value_ordering)
+        else:
+            (count, nodes) = solvers.count_solutions(solver_type, csp, limit)
+        solution = 'solutions: {:d}'.format(count)
+    elif solver_type == solvers.SolverType.CBJ and nogood_capacity > 0:
+        store = solvers.NogoodStore(nogood_capacity)
+        (solution, nodes) = solvers.solve(solver_type, csp, nogoods=store, max_nodes=max_nodes, timeout=timeout)
+        print('Nogood store hits:', store.hits, 'misses:', store.misses)
+    elif restarts != 'off':
+        schedule = solvers.RestartSchedule[restarts.upper()]
+        if solver_type in (solvers.SolverType.BT, solvers.SolverType.BJ, solvers.SolverType.CBJ):
+            (solution, nodes) = solvers.solve_with_restarts(solver_type, csp, schedule, restart_base, seed, variable_ordering, value_ordering, timeout=timeout)
+        else:
+            (solution, nodes) = solvers.solve_with_restarts(solver_type, csp, schedule, restart_base, seed, timeout=timeout)
+    elif solver_type in (solvers.SolverType.BT, solvers.SolverType.BJ, solvers.SolverType.CBJ):
+        (solution, nodes) = solvers.solve(solver_type, csp, variable_ordering, value_ordering, max_nodes=max_nodes, timeout=timeout)
+    else:
+        (solution, nodes) = solvers.solve(solver_type, csp, max_nodes=max_nodes, timeout=timeout)
+    if solution is None:
+        solution = solvers.SolveStatus.BUDGET_EXHAUSTED.name
+    elif solution == []:
+        solution = solvers.SolveStatus.UNSATISFIABLE.name
+    return (solution, nodes)
+
+
+# The network template and arguments of the process solving instances
+instance_context = {}
+
+
+def init_instance_context(template, args):
+    instance_context['template'] = template
+    instance_context['args'] = args
+
+
+def solve_instance(job):
+    """
+    Solves the job (solver_type, i, domains) of the i-th instance given by init_instance_context.
+    Returns (solver_type, i, solution, nodes, seconds, pid), where pid is the id of the process.
+    """
+    (solver_type, i, domains) = job
+    args = instance_context['args']
+    csp = make_constraint_network(instance_context['template'], domains, args['arc'] == 'on', args['bitset'] == 'on', args['ac_algorithm'])
+    start = timer()
+    (solution, nodes) = run_solver(solver_type, csp, args)
+    end = timer()
+    return (solver_type, i, solution, nodes, end - start, os.getpid())
+
+
+def solve_instances(jobs):
+    return [solve_instance(job) for job in jobs]
+
+
+def solve_batch(template, jobs, args, workers, chunksize=1, stream=False):
+    """
+    Solves the jobs (see solve_instance) over a pool of worker processes, sending them
+    chunksize at a time. Yields the results in the order of jobs, or with stream in the
+    order they complete.
+    """
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_instance_context, initargs=(template, args)) as executor:
+        if not stream:
+            yield from executor.map(solve_instance, jobs, chunksize=chunksize)
+        else:
+            chunks = [jobs[k:k + chunksize] for k in range(0, len(jobs), chunksize)]
+            futures = [executor.submit(solve_instances, chunk) for chunk in chunks]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
+
+
 #
 # Main program
 #
+if __name__ == '__main__':
+    # Set up and parsee command-line arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument( "-g", "--gtbt", choices=['on','off'],default='on', help="Run the GTBT solver.")
+    ap.add_argument( "-b", "--bt",   choices=['on','off'],default='on', help="Run the the BT solver.")
+    ap.add_argument( "-j", "--bj",   choices=['on','off'],default='on', help="Run the BJ solver.")
+    ap.add_argument( "-c", "--cbj",  choices=['on','off'],default='on', help="Run the CBJ solver.")
+    ap.add_argument( "-f", "--fc",   choices=['on','off'],default='off', help="Run the FC solver.")
+    ap.add_argument( "-k", "--mac",  choices=['on','off'],default='off', help="Run the MAC solver.")
+    ap.add_argument( "-x", "--sat",  choices=['on','off'],default='off', help="Run the SAT (CDCL) solver.")
+    ap.add_argument( "-i", "--instances", type=int, action='append', help="Run only specified puzzle instance.")
+    ap.add_argument( "-t", "--time",  choices=['on','off'],default='on', help="Display runtime (in seconds).")
+    ap.add_argument( "-a", "--arc",  choices=['on','off'],default='off', help="Make constraint network arc consistent.")
+    ap.add_argument( "-2", "--ac-algorithm", choices=['ac3','ac2001','ne','alldiff','strategies'],default='ac3', help="Algorithm making the network arc consistent, ne propagates singleton domains over the not-equal constraints, alldiff also filters the AllDifferent constraints and strategies applies human Sudoku rules (singles, pairs, triples, pointing, box-line).")
+    ap.add_argument( "-m", "--bitset", choices=['on','off'],default='off', help="Store domains as integer bitsets.")
+    ap.add_argument( "-s", "--stack", choices=['on','off'],default='off', help="Use the explicit stack (non-recursive) solvers.")
+    ap.add_argument( "-o", "--order", choices=['static','mrv','mrv-degree','dom-wdeg'],default='static', help="Variable ordering heuristic of the BT, BJ and CBJ solvers.")
+    ap.add_argument( "-v", "--values", choices=['ascending','lcv'],default='ascending', help="Value ordering heuristic of the BT, BJ and CBJ solvers.")
+    ap.add_argument( "-n", "--nogoods", type=int, default=0, help="Capacity of the nogood store of the CBJ solver (0 for none), which then uses the static orderings. Cannot be combined with --restarts.")
+    ap.add_argument( "-r", "--restarts", choices=['off','luby','geometric'],default='off', help="Restart the solvers with this node budget schedule, each run trying the values in a random order (and breaking the ties of a dynamic variable ordering at random). Cannot be combined with --nogoods.")
+    ap.add_argument( "--restart-base", type=int, default=100, help="Node budget of the first restart.")
+    ap.add_argument( "--seed", type=int, default=None, help="Seed of the random tie-breaking of the restarts.")
+    ap.add_argument( "-u", "--count", type=int, default=None, help="Count the solutions instead, stopping at this many (0 for all, 2 checks uniqueness).")
+    ap.add_argument( "--max-nodes", type=int, default=None, help="Give up a search after this many nodes (not when restarting or counting).")
+    ap.add_argument( "--timeout", type=float, default=None, help="Give up a search after this many seconds (not when counting).")
+    ap.add_argument( "-w", "--workers", type=int, default=0, help="Solve the instances in a pool of this many worker processes (0 for none).")
+    ap.add_argument( "--chunksize", type=int, default=1, help="Number of instances sent to a worker process at a time.")
+    ap.add_argument( "--stream", choices=['on','off'],default='off', help="Print the results of the worker processes as they complete instead of in input order.")
+    ap.add_argument( "-name", default='sudoku', help="Basename of constraint and instances files (e.g. sudoku).")
+
+    args = vars(ap.parse_args())
+    if args['nogoods'] > 0 and args['restarts'] != 'off':
+        ap.error("--nogoods cannot be combined with --restarts")
+    print(args)
+    solvers_to_run = []
+    if args['gtbt'] == 'on':
+        solvers_to_run.append(solvers.SolverType.GTBT)
+    if args['bt'] == 'on':
+        solvers_to_run.append(solvers.SolverType.BT)
+    if args['bj'] == 'on':
+        solvers_to_run.append(solvers.SolverType.BJ)
+    if args['cbj'] == 'on':
+        solvers_to_run.append(solvers.SolverType.CBJ)
+    if args['stack'] == 'on':
+        solvers_to_run = [solvers.ITERATIVE_SOLVER_TYPES[st] for st in solvers_to_run]
+    if args['fc'] == 'on':
+        solvers_to_run.append(solvers.SolverType.FC)
+    if args['mac'] == 'on':
+        solvers_to_run.append(solvers.SolverType.MAC)
+    if args['sat'] == 'on':
+        solvers_to_run.append(solvers.SolverType.SAT)
+    if args['instances']:
+        specific_instances_to_run = args['instances']
+    else:
+        specific_instances_to_run = []
+    display_time = (args['time'] == 'on')
+    workers = args['workers']
+    chunksize = args['chunksize']
+    stream = (args['stream'] == 'on')
+    name = args['name']
+    input_cnstr_file = name + "_cst.txt"
+    input_domain_file = name + "_dom.txt"
+
+    # Read in CSP problem specification.
+    problem_constraints = read_binary_constraints(input_cnstr_file)
+    print('Read', len(problem_constraints), 'constraints.')
+    problem_instances = read_domains_of_instances(input_domain_file)
+    print('Read', len(problem_instances), 'problem instances.')
+    network_template = make_network_template(problem_constraints, problem_instances)
 
-# Set up and parsee command-line arguments
-ap = argparse.ArgumentParser()
-ap.add_argument( "-g", "--gtbt", choices=['on','off'],default='on', help="Run the GTBT solver.")
-ap.add_argument( "-b", "--bt",   choices=['on','off'],default='on', help="Run the the BT solver.")
-ap.add_argument( "-j", "--bj",   choices=['on','off'],default='on', help="Run the BJ solver.")
-ap.add_argument( "-c", "--cbj",  choices=['on','off'],default='on', help="Run the CBJ solver.")
-ap.add_argument( "-i", "--instances", type=int, action='append', help="Run only specified puzzle instance.")
-ap.add_argument( "-t", "--time",  choices=['on','off'],default='on', help="Display runtime (in seconds).")
-ap.add_argument( "-a", "--arc",  choices=['on','off'],default='off', help="Make constraint network arc consistent.")
-ap.add_argument( "-name", default='sudoku', help="Basename of constraint and instances files (e.g. sudoku).")
-
-args = vars(ap.parse_args())
-print(args)
-solvers_to_run = []
-if args['gtbt'] == 'on':
-    solvers_to_run.append(solvers.SolverType.GTBT)
-if args['bt'] == 'on':
-    solvers_to_run.append(solvers.SolverType.BT)
-if args['bj'] == 'on':
-    solvers_to_run.append(solvers.SolverType.BJ)
-if args['cbj'] == 'on':
-    solvers_to_run.append(solvers.SolverType.CBJ)
-if args['instances']:
-    specific_instances_to_run = args['instances']
-else:
-    specific_instances_to_run = []
-display_time = (args['time'] == 'on')
-arc_consistent = (args['arc'] == 'on')
-name = args['name']
-input_cnstr_file = name + "_cst.txt"
-input_domain_file = name + "_dom.txt"
-
-# Read in CSP problem specification.
-problem_constraints = read_binary_constraints(input_cnstr_file)
-print('Read', len(problem_constraints), 'constraints.')
-problem_instances = read_domains_of_instances(input_domain_file)
-print('Read', len(problem_instances), 'problem instances.')
-
-# Run the specified solvers on the given problem instances and log results (output.txt).
-for solver_type in solvers_to_run:
-    for i,instance in enumerate(problem_instances):
-        if not specific_instances_to_run or i in specific_instances_to_run:
-            csp = make_constraint_network(problem_constraints, instance, arc_consistent)
-            start = timer()
-            (solution, nodes) = solvers.solve(solver_type, csp)
-            end = timer()
-            if display_time:
-                output = "{:3d} {:15s} {:10d} {:9.4f} {:s}".format(i, str(solver_type), nodes, end-start, str(solution))
-            else:
-                output = "{:3d} {:15s} {:10d} {:s}".format(i, str(solver_type),nodes, str(solution))
-            print(output)
-            log_string(output)
+    # Run the specified solvers on the given problem instances and log results (output.txt).
+    jobs = [(solver_type, i, instance) for solver_type in solvers_to_run for i, instance in enumerate(problem_instances) if not specific_instances_to_run or i in specific_instances_to_run]
+    if workers > 0:
+        results = solve_batch(network_template, jobs, args, workers, chunksize, stream)
+    else:
+        init_instance_context(network_template, args)
+        results = map(solve_instance, jobs)
+    worker_times = {}
+    for (solver_type, i, solution, nodes, seconds, pid) in results:
+        if display_time:
+            output = "{:3d} {:15s} {:10d} {:9.4f} {:s}".format(i, str(solver_type), nodes, seconds, str(solution))
+        else:
+            output = "{:3d} {:15s} {:10d} {:s}".format(i, str(solver_type),nodes, str(solution))
+        print(output)
+        log_string(output)
+        (num_solved, total) = worker_times.get(pid, (0, 0.0))
+        worker_times[pid] = (num_solved + 1, total + seconds)
+    if workers > 0:
+        for pid, (num_solved, total) in sorted(worker_times.items()):
+            print('Worker {:d}: {:d} instances in {:.4f} seconds'.format(pid, num_solved, total))
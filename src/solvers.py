@@ -4,10 +4,17 @@
 # Implementation of various backtracking-based solvers
 #
 
+import random
 from enum import Enum
-from collections import deque
+from timeit import default_timer as timer
+from collections import deque, namedtuple, OrderedDict
 from itertools import chain
 
+try:
+    from . import sat
+except ImportError:  # Run from within the src folder
+    import sat
+
 
 class SolverType(Enum):
     """Solver types enum"""
@@ -16,32 +23,239 @@ class SolverType(Enum):
     BT = 2  # Cronological Backtracking
     BJ = 3  # Backjumping
     CBJ = 4  # Conflict-Directed Backjumping
+    GTBT_IT = 5  # Generate-and-test Backtracking (explicit stack)
+    BT_IT = 6  # Cronological Backtracking (explicit stack)
+    BJ_IT = 7  # Backjumping (explicit stack)
+    CBJ_IT = 8  # Conflict-Directed Backjumping (explicit stack)
+    FC = 9  # Forward Checking
+    MAC = 10  # Maintaining Arc Consistency
+    SAT = 11  # CDCL on the SAT encoding of the network
+
+
+class VariableOrdering(Enum):
+    """Variable ordering heuristics enum"""
+
+    STATIC = 1  # Index order 0,...,n-1
+    MRV = 2  # Minimum Remaining Values
+    MRV_DEGREE = 3  # MRV, ties broken by the most unassigned neighbours
+    DOM_WDEG = 4  # Remaining values over the conflict-weighted degree
+
+
+class ValueOrdering(Enum):
+    """Value ordering heuristics enum"""
+
+    ASCENDING = 1  # Smallest value first
+    LCV = 2  # Least Constraining Value, fewest values pruned from neighbours first
+
+
+class RestartSchedule(Enum):
+    """Node budget schedules of solve_with_restarts"""
+
+    LUBY = 1  # base times the Luby sequence 1,1,2,1,1,2,4,...
+    GEOMETRIC = 2  # base times growth to the power of the restart number
+
+
+# The recursive solver types and their explicit stack counterparts
+ITERATIVE_SOLVER_TYPES = {
+    SolverType.GTBT: SolverType.GTBT_IT,
+    SolverType.BT: SolverType.BT_IT,
+    SolverType.BJ: SolverType.BJ_IT,
+    SolverType.CBJ: SolverType.CBJ_IT,
+}
+
+
+class SolveStatus(Enum):
+    """Outcomes of a search with limits"""
+
+    SOLVED = 1
+    UNSATISFIABLE = 2
+    BUDGET_EXHAUSTED = 3  # The node or time limit was reached
+    CANCELLED = 4
+
+
+# The state of a search generated by solve_steps: the depth and values of the
+# assigned variables and the number of nodes so far, with the SolveStatus once done
+SearchSnapshot = namedtuple(
+    'SearchSnapshot', ['depth', 'assignment', 'nodes', 'status']
+)
+
+
+class CancellationToken:
+    """
+    Stops the searches it is given once cancelled. Cancelling only sets a flag, so it
+    can be done from another thread or a signal handler, and the searches notice it
+    within SearchLimits.CHECK_INTERVAL nodes.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_cancelled(self):
+        return self.cancelled
+
+
+class _LimitReached(Exception):
+    """Raised by a solver reaching one of its SearchLimits"""
+
+
+class SearchLimits:
+    """
+    The node limit, deadline and cancellation token of a search. The solvers call
+    next_check when their node count passes the count it last returned, so the clock
+    and the token are only read every CHECK_INTERVAL nodes (or interval if given),
+    and the explicit stack solvers pause there when stepped (see solve_steps).
+    """
+
+    CHECK_INTERVAL = 1000
+
+    def __init__(self, max_nodes=None, timeout=None, token=None, interval=None):
+        """
+        Constructor: the search stops after max_nodes nodes, timeout seconds from
+        now or once the token is cancelled, each optional.
+        """
+        self.max_nodes = float('inf') if max_nodes is None else max_nodes
+        self.deadline = None if timeout is None else timer() + timeout
+        self.token = token
+        self.interval = interval
+
+    def stopped(self):
+        """
+        Returns True if the deadline has passed or the token is cancelled.
+        """
+        if self.token is not None and self.token.is_cancelled():
+            return True
+        return self.deadline is not None and timer() > self.deadline
+
+    def next_check(self, num_nodes):
+        """
+        Raises _LimitReached if a limit is reached after num_nodes nodes, otherwise
+        returns the node count of the next check.
+        """
+        if num_nodes > self.max_nodes or self.stopped():
+            raise _LimitReached()
+        if self.interval is not None:
+            return min(self.max_nodes, num_nodes + self.interval - 1)
+        if self.deadline is None and self.token is None:
+            return self.max_nodes
+        return min(self.max_nodes, num_nodes + self.CHECK_INTERVAL)
+
 
+class NogoodStore:
+    """
+    A bounded store of nogoods, partial assignments that cannot be extended to a
+    solution, learnt by CBJ from the conflict set of each dead end. A nogood is
+    indexed by its deepest variable and that variable's value, so it is only checked
+    when that variable is assigned the value, and once capacity nogoods are stored
+    the least recently used one is evicted.
+    """
+
+    def __init__(self, capacity):
+        """
+        Constructor: capacity is the maximum number of nogoods kept.
+        """
+        assert capacity > 0
+        self.capacity = capacity
+        self.nogoods = OrderedDict()  # All nogoods, least recently used first
+        self.index = {}  # (variable, value) -> set of nogoods ending with it
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def add(self, literals):
+        """
+        Stores the nogood given as a list of (variable, value) pairs.
+        """
+        nogood = tuple(sorted(literals))
+        if not nogood or nogood in self.nogoods:
+            return
+        self.nogoods[nogood] = None
+        self.index.setdefault(nogood[-1], set()).add(nogood)
+        if len(self.nogoods) > self.capacity:
+            (evicted, _) = self.nogoods.popitem(last=False)
+            self.index[evicted[-1]].discard(evicted)
 
-def revise(cn, i, j):
+    def find(self, A):
+        """
+        Looks for a stored nogood completed by the assignment of the last variable in
+        A. Returns the other variables of the first one found, or None.
+        """
+        i = len(A) - 1
+        for nogood in self.index.get((i, A[i]), ()):
+            if all(A[j] == v for (j, v) in nogood[:-1]):
+                self.hits += 1
+                self.nogoods.move_to_end(nogood)
+                return [j for (j, _) in nogood[:-1]]
+        self.misses += 1
+        return None
+
+
+def revise(cn, i, j, trail=False):
     """Remove values in the domain of i if they
     don't allow variable j to take any value.
+    With trail the removals are recorded on the trail of cn.
     """
+    if cn.bitset:
+        return revise_bitset(cn, i, j, trail)
+
     dom_i = cn.get_domain(i)
+    dom_j = cn.get_domain(j)
+    consistent = cn.check_values(i, j)
 
     # All values in D_i such that no assignment of x_j is consistent
     to_rem = {
         val_i
         for val_i in dom_i
-        if not any(
-            cn.consistent_values(i, j, val_i, val_j) for val_j in cn.get_domain(j)
-        )
+        if not any(consistent(val_i, val_j) for val_j in dom_j)
     }
 
     # If we found domain values to remove
     if to_rem:
-        dom_i -= to_rem  # dom_i = dom_i \setminus to_rem
+        if trail:
+            for val_i in to_rem:
+                cn.remove_value(i, val_i)
+        else:
+            dom_i -= to_rem  # dom_i = dom_i \setminus to_rem
         return True
 
     # If no values to remove from D_i are found, we return false
     return False
 
 
+def revise_bitset(cn, i, j, trail=False):
+    """Bitset version of revise, for networks storing domains as integers.
+    A value of i is unsupported if D_j has no value other than it.
+    """
+    if j not in cn.get_vars_in_contraint_with(i):
+        return False
+
+    dom_i = cn.get_domain_mask(i)
+    dom_j = cn.get_domain_mask(j)
+
+    # Iterate over the bits of D_i, lowest first
+    to_rem = 0
+    rest = dom_i
+    while rest:
+        low = rest & -rest
+        if not dom_j & ~low:
+            to_rem |= low
+        rest ^= low
+
+    # If we found domain values to remove
+    if to_rem:
+        if trail:
+            cn.remove_mask(i, to_rem)
+        else:
+            cn.set_domain_mask(i, dom_i & ~to_rem)
+        return True
+
+    return False
+
+
 def init_constraint_queue(cn):
     """Instantiate a queue with all constraints, including symmetric duplicates
     as the algorithm provided in the article does not assume constraints
@@ -78,26 +292,366 @@ def make_arc_consistent(cn):
                     queue.append((h, i))
 
 
-def solve(st, cn):
+def make_arc_consistent_2001(cn):
+    """
+    Makes the cn constraint network arc-consistent with the AC-2001/3.1 algorithm.
+    It works like AC-3 but remembers, for each arc (i, j) and value of D_i, the last
+    support found in D_j and resumes the search for a new one after it.
+    Returns the number of constraint checks performed.
+    """
+    # Supports are searched for in the initial order of each domain, last maps
+    # (i, j, val_i) to the position of the last support of val_i in order[j]
+    order = [cn.get_sorted_domain(j) for j in range(cn.num_variables())]
+    last = {}
+    checks = 0
+
+    if cn.bitset:
+        def in_domain(j, val):
+            return cn.get_domain_mask(j) >> val & 1
+
+        def remove(i, val):
+            cn.set_domain_mask(i, cn.get_domain_mask(i) & ~(1 << val))
+    else:
+        def in_domain(j, val):
+            return val in cn.get_domain(j)
+
+        def remove(i, val):
+            cn.get_domain(i).remove(val)
+
+    def revise_2001(i, j):
+        nonlocal checks
+        revised = False
+        values_j = order[j]
+        consistent = None  # Looked up at the first check, most arcs need none
+        for val_i in cn.get_sorted_domain(i):
+            # The last support is still valid
+            k = last.get((i, j, val_i), -1)
+            if k >= 0 and in_domain(j, values_j[k]):
+                continue
+
+            # Resume the search after the last support
+            for k in range(k + 1, len(values_j)):
+                val_j = values_j[k]
+                if in_domain(j, val_j):
+                    checks += 1
+                    if consistent is None:
+                        consistent = cn.check_values(i, j)
+                    if consistent(val_i, val_j):
+                        last[(i, j, val_i)] = k
+                        break
+            else:
+                remove(i, val_i)
+                revised = True
+        return revised
+
+    queue = init_constraint_queue(cn)  # includes symmetric duplicates
+    while queue:
+        i, j = queue.popleft()
+        if revise_2001(i, j):
+            for h in cn.get_vars_in_contraint_with(i):
+                if h != j:
+                    queue.append((h, i))
+    return checks
+
+
+def revise_ne(cn, i, j, trail=False):
+    """Revise for the not-equal constraint between i and j: a value of i only
+    loses its support when D_j is reduced to that value, so nothing is scanned
+    unless D_j is a singleton.
+    With trail the removal is recorded on the trail of cn.
+    """
+    if cn.bitset:
+        dom_j = cn.get_domain_mask(j)
+        if dom_j & (dom_j - 1) or not cn.get_domain_mask(i) & dom_j:
+            return False
+        if trail:
+            cn.remove_mask(i, dom_j)
+        else:
+            cn.set_domain_mask(i, cn.get_domain_mask(i) & ~dom_j)
+        return True
+
+    dom_j = cn.get_domain(j)
+    if len(dom_j) != 1:
+        return False
+    (val_j,) = dom_j
+    if trail:
+        return cn.remove_value(i, val_j)
+    dom_i = cn.get_domain(i)
+    if val_j not in dom_i:
+        return False
+    dom_i.remove(val_j)
+    return True
+
+
+def propagate_ne(cn, queue, trail=False):
+    """
+    Arc consistency for not-equal constraints. The queue holds variables whose
+    domain is a singleton; the value of each is removed from the domains of its
+    peers and the peers reduced to a singleton are queued in turn. A variable
+    becomes a singleton at most once, so every arc is revised at most once.
+    Returns False if some domain is wiped out, otherwise True.
+    """
+    while queue:
+        j = queue.popleft()
+        for i in cn.get_vars_in_contraint_with(j):
+            if revise_ne(cn, i, j, trail):
+                size = cn.domain_size(i)
+                if size == 0:
+                    return False
+                if size == 1:
+                    queue.append(i)
+    return True
+
+
+def make_arc_consistent_ne(cn, trail=False):
+    """
+    Makes the cn constraint network arc-consistent, using that all its constraints
+    are not-equal constraints: only the variables with a singleton domain
+    propagate. Returns False if some domain is wiped out, otherwise True.
+    """
+    queue = deque(i for i in range(cn.num_variables()) if cn.domain_size(i) == 1)
+    return propagate_ne(cn, queue, trail)
+
+
+def filter_alldiff(cn, scope, trail=False):
+    """
+    Regin's filtering of the AllDifferent constraint over the variables in scope.
+    A maximum matching of the variables to their values is found, and a value is
+    removed if its edge is in no maximum matching: it is not matched, not on an
+    alternating cycle (both ends in one strongly connected component) and not on
+    an alternating path from a free value.
+    With trail the removals are recorded on the trail of cn.
+    Returns None if no matching covers all variables, otherwise the list of
+    variables whose domains were reduced.
+    """
+    # pylint: disable=too-many-locals
+    k = len(scope)
+    domains = [cn.get_sorted_domain(x) for x in scope]
+
+    # Maximum matching by augmenting paths, match_of maps a value to its variable
+    match = [None] * k
+    match_of = {}
+
+    def augment(a, visited):
+        for v in domains[a]:
+            if v not in visited:
+                visited.add(v)
+                if v not in match_of or augment(match_of[v], visited):
+                    match[a] = v
+                    match_of[v] = a
+                    return True
+        return False
+
+    for a in range(k):
+        if not augment(a, set()):
+            return None
+
+    # The alternating graph: variables are nodes 0,...,k-1 followed by the values,
+    # matched edges go from variable to value and the others from value to variable
+    node_of = {}
+    for values in domains:
+        for v in values:
+            node_of.setdefault(v, k + len(node_of))
+    succ = [[node_of[match[a]]] for a in range(k)] + [[] for _ in node_of]
+    for a, values in enumerate(domains):
+        for v in values:
+            if v != match[a]:
+                succ[node_of[v]].append(a)
+
+    # Nodes on an alternating path from a free value
+    reached = [False] * len(succ)
+    queue = deque(node_of[v] for v in node_of if v not in match_of)
+    for u in queue:
+        reached[u] = True
+    while queue:
+        u = queue.popleft()
+        for w in succ[u]:
+            if not reached[w]:
+                reached[w] = True
+                queue.append(w)
+
+    # Strongly connected components (Tarjan)
+    index = [None] * len(succ)
+    low = [0] * len(succ)
+    comp = [None] * len(succ)
+    stack = []
+    counter = 0
+
+    def strongconnect(u):
+        nonlocal counter
+        index[u] = low[u] = counter
+        counter += 1
+        stack.append(u)
+        for w in succ[u]:
+            if index[w] is None:
+                strongconnect(w)
+                low[u] = min(low[u], low[w])
+            elif comp[w] is None:
+                low[u] = min(low[u], index[w])
+        if low[u] == index[u]:
+            while True:
+                w = stack.pop()
+                comp[w] = u
+                if w == u:
+                    break
+
+    for u in range(len(succ)):
+        if index[u] is None:
+            strongconnect(u)
+
+    changed = []
+    for a, values in enumerate(domains):
+        removed = {
+            v
+            for v in values
+            if v != match[a]
+            and comp[a] != comp[node_of[v]]
+            and not reached[node_of[v]]
+        }
+        if removed:
+            x = scope[a]
+            if trail:
+                for v in removed:
+                    cn.remove_value(x, v)
+            else:
+                cn.set_domain(x, set(values) - removed)
+            changed.append(x)
+    return changed
+
+
+def propagate_alldiff(cn, changed, trail=False):
+    """
+    Propagates the AllDifferent constraints of cn, filtered with filter_alldiff, and
+    its not-equal constraints, as in propagate_ne, after the domains of the
+    variables in changed were reduced. Singletons are propagated before the more
+    expensive matching-based filtering.
+    Returns False if some constraint cannot be satisfied, otherwise True.
+    """
+    constraints = cn.get_alldiff_constraints()
+    pending = deque()
+    queued = set()
+    singletons = deque()
+
+    def reduced(x, filtered):
+        # Queue the constraints on x except the one whose filtering reduced it
+        for c in cn.get_alldiff_constraints_with(x):
+            if c != filtered and c not in queued:
+                queued.add(c)
+                pending.append(c)
+        if cn.domain_size(x) == 1:
+            singletons.append(x)
+
+    for x in changed:
+        reduced(x, None)
+    while singletons or pending:
+        if singletons:
+            j = singletons.popleft()
+            for i in cn.get_vars_in_contraint_with(j):
+                if revise_ne(cn, i, j, trail):
+                    if cn.domain_size(i) == 0:
+                        return False
+                    reduced(i, None)
+        else:
+            c = pending.popleft()
+            queued.discard(c)
+            filtered = filter_alldiff(cn, constraints[c], trail)
+            if filtered is None:
+                return False
+            for x in filtered:
+                reduced(x, c)
+    return True
+
+
+def make_arc_consistent_alldiff(cn, trail=False):
+    """
+    Makes the cn constraint network generalised arc-consistent, filtering each
+    AllDifferent constraint as a whole instead of its not-equal decomposition.
+    Returns False if some constraint cannot be satisfied, otherwise True.
+    """
+    return propagate_alldiff(cn, range(cn.num_variables()), trail)
+
+
+def solve(
+    st,
+    cn,
+    var_order=VariableOrdering.STATIC,
+    val_order=ValueOrdering.ASCENDING,
+    nogoods=None,
+    max_nodes=None,
+    rng=None,
+    on_solution=None,
+    timeout=None,
+    token=None,
+):
     """
     Use the specified backtracking algorithm (st) to solve the CSP problem (cn).
     Returns a tuple (assignment, nodes), where the former is the solution (an empty list
     if not found) and the latter the number of nodes generated.
+    Variables are assigned in index order and values tried in ascending order unless
+    another var_order or val_order is given, which only BT, BJ and CBJ support.
+    CBJ learns a nogood at each dead end into the NogoodStore nogoods if given, and
+    prunes the assignments completing one of them.
+    With max_nodes the search gives up after that many nodes, with timeout after that
+    many seconds and with the CancellationToken token once it is cancelled, and the
+    assignment returned is None instead (see solve_with_budget).
+    With rng (a random.Random) the values are tried in an order drawn at random for
+    this run instead of ascending, and given to the dynamic orderings to break ties.
+    With on_solution the search calls it with (a copy of) each solution found and
+    only stops at one if it returns True, see count_solutions.
     """
+    search = _search(
+        st,
+        cn,
+        var_order,
+        val_order,
+        nogoods,
+        SearchLimits(max_nodes, timeout, token),
+        rng,
+        on_solution,
+    )
+    while True:
+        try:
+            next(search)
+        except StopIteration as done:
+            return done.value
+
+
+def _search(st, cn, var_order, val_order, nogoods, limits, rng, on_solution):
+    # The body of solve, generating a SearchSnapshot whenever the explicit stack
+    # solvers check the limits
     # pylint: disable=too-many-statements, unused-variable
 
+    def found(A):
+        # Reports the solution A, returns True if the search should stop at it
+        return on_solution is None or on_solution(list(A))
+
+    def ordered_domain(cn, i):
+        # The values of D_i in ascending order, or in the random order of the run
+        values = cn.get_sorted_domain(i)
+        if value_rank is not None:
+            values.sort(key=value_rank.__getitem__)
+        return values
+
     def consistent_upto_level(cn, i, A):
-        for j in range(0, i):
-            if not cn.consistent(i, j, A):
+        # Only variables before i sharing a constraint with it can be violated,
+        # and they are sorted so the lowest such level is found first
+        v = A[i]
+        for j in earlier_peers[i]:
+            if A[j] == v:
                 return j
         return i
 
+    def consistent_all(cn, A):
+        return all(consistent_upto_level(cn, i, A) == i for i in range(len(A)))
+
     def GTB(cn, i, A):
-        nonlocal num_nodes
+        nonlocal num_nodes, node_limit
         num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
         if i >= cn.num_variables():
-            return cn.consistent_all(A)
-        for v in cn.get_sorted_domain(i):
+            return consistent_all(cn, A) and found(A)
+        for v in ordered_domain(cn, i):
             A.append(v)
             solved = GTB(cn, i + 1, A)
             if solved:
@@ -107,18 +661,20 @@ def solve(st, cn):
 
     def BT(cn, i, A):
         # Node counter
-        nonlocal num_nodes
+        nonlocal num_nodes, node_limit
         num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
 
         # Try all assignments of x_i in D_i
-        for v in cn.get_sorted_domain(i):
+        for v in ordered_domain(cn, i):
 
             # Assign current value
             A.append(v)
 
             # If a solution is found
-            if cn.consistent_other(i, A) and (
-                i == cn.num_variables() - 1 or BT(cn, i + 1, A)
+            if consistent_upto_level(cn, i, A) == i and (
+                found(A) if i == cn.num_variables() - 1 else BT(cn, i + 1, A)
             ):
                 return True
 
@@ -130,14 +686,16 @@ def solve(st, cn):
 
     def BJ(cn, i, A):
         # Node counter
-        nonlocal num_nodes
+        nonlocal num_nodes, node_limit
         num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
 
         # Init return_depth to a value less then all levels
         return_depth = -1
 
         # Try all assignments of x_i in D_i
-        for v in cn.get_sorted_domain(i):
+        for v in ordered_domain(cn, i):
 
             # Assign current value
             A.append(v)
@@ -146,11 +704,15 @@ def solve(st, cn):
             max_check_lvl = consistent_upto_level(cn, i, A)
 
             # If consistent with variables x_0,...,x_{i-1}
-            if i == max_check_lvl:
+            if i == max_check_lvl and i == cn.num_variables() - 1:
                 # We found a solution as all variables are expanded and consistent
-                if i == cn.num_variables() - 1:
+                if found(A):
                     return True, -1
 
+                # When searching on, the solution depends on all of x_0,...,x_{i-1}
+                # so no ancestor may be jumped over
+                max_check_lvl = i - 1
+            elif i == max_check_lvl:
                 # Recursion
                 solved, max_check_lvl = BJ(cn, i + 1, A)
 
@@ -176,14 +738,16 @@ def solve(st, cn):
 
     def CBJ(cn, i, A, CS):
         # Node counter
-        nonlocal num_nodes
+        nonlocal num_nodes, node_limit
         num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
 
         # Init CS[i] to a singleton wich value is less then all levels
         CS[i] = {-1}
 
         # Try all assignments of x_i in D_i
-        for v in cn.get_sorted_domain(i):
+        for v in ordered_domain(cn, i):
 
             # Assign current value
             A.append(v)
@@ -191,14 +755,25 @@ def solve(st, cn):
             # Lowest index of variable that is not consistent with i, or i if all are
             h = consistent_upto_level(cn, i, A)
 
+            # The other variables of a learnt nogood completed by the assignment
+            culprits = None
+            if h == i and nogoods is not None:
+                culprits = nogoods.find(A)
+
             if h < i:  # If not consistent
                 # Add the lowest index that fails to the conflict set
                 CS[i].add(h)
-            else:  # If consistent
+            elif culprits is not None:  # If a learnt nogood is violated
+                # All the other variables of the nogood share the blame
+                CS[i].update(culprits)
+            elif i == cn.num_variables() - 1:  # If consistent and complete
                 # We found a solution as all variables are expanded and consistent
-                if i == cn.num_variables() - 1:
+                if found(A):
                     return True, -1
 
+                # When searching on, the solution depends on all of x_0,...,x_{i-1}
+                CS[i].update(range(i))
+            else:  # If consistent
                 # Recursion
                 solved, r_depth = CBJ(cn, i + 1, A, CS)
 
@@ -221,6 +796,11 @@ def solve(st, cn):
         # to the deepest level among all levels in the conflict set.
         r_depth = max(CS[i])
 
+        # The values of the variables in the conflict set rule out every value of
+        # x_i, so they form a nogood
+        if nogoods is not None:
+            nogoods.add([(j, A[j]) for j in CS[i] if j >= 0])
+
         # Pass up causes of failures, disregarding the failure of the node we pass
         # to. That is, we find the node we can jump to and copy all the elements
         # of the current node's conflict set, except that node, to its conflict set.
@@ -231,17 +811,764 @@ def solve(st, cn):
         # If all values in D_i fail, return failure and the 'jumping distance'
         return False, r_depth
 
+    # The functions below are the explicit stack versions of the ones above. Each
+    # stack entry holds the iterator over the values left to try for the variable
+    # at that depth, so len(stack) - 1 is the current variable and A holds the
+    # values of the variables below it. They generate the same nodes in the same
+    # order as the recursive versions but do not grow the Python call stack.
+
+    def GTB_iter(cn, A):
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+            yield SearchSnapshot(len(A), list(A), num_nodes, None)
+        last = cn.num_variables() - 1
+        if last < 0:
+            return consistent_all(cn, A)
+        stack = [iter(ordered_domain(cn, 0))]
+        while stack:
+            i = len(stack) - 1
+            v = next(stack[-1], None)
+
+            # All values of x_i tried, go back to x_{i-1} and remove its value
+            if v is None:
+                stack.pop()
+                if A:
+                    A.pop()
+                continue
+
+            A.append(v)
+            num_nodes += 1
+            if num_nodes > node_limit:
+                node_limit = limits.next_check(num_nodes)
+                yield SearchSnapshot(len(A), list(A), num_nodes, None)
+            if i == last:
+                if consistent_all(cn, A) and found(A):
+                    return True
+                A.pop()
+            else:
+                stack.append(iter(ordered_domain(cn, i + 1)))
+        return False
+
+    def BT_iter(cn, A):
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+            yield SearchSnapshot(len(A), list(A), num_nodes, None)
+        last = cn.num_variables() - 1
+        stack = [iter(ordered_domain(cn, 0))]
+        while stack:
+            i = len(stack) - 1
+
+            # Find the next value of x_i consistent with x_0,...,x_{i-1}
+            for v in stack[-1]:
+                A.append(v)
+                if consistent_upto_level(cn, i, A) == i:
+                    break
+                A.pop()
+            else:
+                # All values of x_i fail, go back to x_{i-1} and remove its value
+                stack.pop()
+                if A:
+                    A.pop()
+                continue
+
+            # We found a solution as all variables are expanded and consistent
+            if i == last:
+                if found(A):
+                    return True
+                A.pop()
+                continue
+
+            # Expand x_{i+1}
+            num_nodes += 1
+            if num_nodes > node_limit:
+                node_limit = limits.next_check(num_nodes)
+                yield SearchSnapshot(len(A), list(A), num_nodes, None)
+            stack.append(iter(ordered_domain(cn, i + 1)))
+        return False
+
+    def BJ_iter(cn, A):
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+            yield SearchSnapshot(len(A), list(A), num_nodes, None)
+        last = cn.num_variables() - 1
+
+        # Each entry also holds the return_depth of its node
+        stack = [[iter(ordered_domain(cn, 0)), -1]]
+        while stack:
+            i = len(stack) - 1
+            frame = stack[-1]
+
+            # Find the next value of x_i consistent with x_0,...,x_{i-1}
+            for v in frame[0]:
+                A.append(v)
+                max_check_lvl = consistent_upto_level(cn, i, A)
+                if i == max_check_lvl:
+                    break
+                frame[1] = max(frame[1], max_check_lvl)
+                A.pop()
+            else:
+                # All values of x_i fail, jump to the deepest conflicting level,
+                # removing the values of every variable on the way
+                return_depth = frame[1]
+                stack.pop()
+                while stack:
+                    A.pop()
+                    if return_depth < len(stack) - 1:
+                        stack.pop()
+                    else:
+                        stack[-1][1] = max(stack[-1][1], return_depth)
+                        break
+                continue
+
+            # We found a solution as all variables are expanded and consistent
+            if i == last:
+                if found(A):
+                    return True
+                frame[1] = max(frame[1], i - 1)
+                A.pop()
+                continue
+
+            # Expand x_{i+1}
+            num_nodes += 1
+            if num_nodes > node_limit:
+                node_limit = limits.next_check(num_nodes)
+                yield SearchSnapshot(len(A), list(A), num_nodes, None)
+            stack.append([iter(ordered_domain(cn, i + 1)), -1])
+        return False
+
+    def CBJ_iter(cn, A, CS):
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+            yield SearchSnapshot(len(A), list(A), num_nodes, None)
+        last = cn.num_variables() - 1
+        CS[0] = {-1}
+        stack = [iter(ordered_domain(cn, 0))]
+        while stack:
+            i = len(stack) - 1
+
+            # Find the next value of x_i consistent with x_0,...,x_{i-1}, adding
+            # the lowest failing level of the others to the conflict set
+            for v in stack[-1]:
+                A.append(v)
+                h = consistent_upto_level(cn, i, A)
+                if h == i:
+                    break
+                CS[i].add(h)
+                A.pop()
+            else:
+                # All values of x_i fail, pass the conflict set up to the deepest
+                # level in it and jump there, removing the values of every
+                # variable on the way
+                r_depth = max(CS[i])
+                CS[r_depth].update(CS[i])
+                CS[r_depth].discard(r_depth)
+                stack.pop()
+                while stack:
+                    A.pop()
+                    if r_depth < len(stack) - 1:
+                        stack.pop()
+                    else:
+                        break
+                continue
+
+            # We found a solution as all variables are expanded and consistent
+            if i == last:
+                if found(A):
+                    return True
+                CS[i].update(range(i))
+                A.pop()
+                continue
+
+            # Expand x_{i+1}
+            num_nodes += 1
+            if num_nodes > node_limit:
+                node_limit = limits.next_check(num_nodes)
+                yield SearchSnapshot(len(A), list(A), num_nodes, None)
+            CS[i + 1] = {-1}
+            stack.append(iter(ordered_domain(cn, i + 1)))
+        return False
+
+    def FC(cn, i, A):
+        # Node counter
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+
+        # Values inconsistent with x_0,...,x_{i-1} have already been pruned
+        for v in ordered_domain(cn, i):
+
+            # Assign current value
+            A.append(v)
+
+            # We found a solution as all variables are expanded
+            if i == cn.num_variables() - 1:
+                if found(A):
+                    return True
+                A.pop()
+                continue
+
+            # Prune v from the domains of the unassigned neighbours of x_i and
+            # continue unless one of them is wiped out
+            cn.push_level()
+            if forward_check(cn, i, v) and FC(cn, i + 1, A):
+                return True
+
+            # Restore the pruned values and remove current value
+            cn.pop_level()
+            A.pop()
+
+        # If all values in D_i are exhausted we fail
+        return False
+
+    def MAC(cn, i, A):
+        # Node counter
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+
+        # The network is arc-consistent given x_0,...,x_{i-1}
+        for v in ordered_domain(cn, i):
+
+            # Assign current value
+            A.append(v)
+
+            # We found a solution as all variables are expanded
+            if i == cn.num_variables() - 1:
+                if found(A):
+                    return True
+                A.pop()
+                continue
+
+            # Reduce D_i to {v} and make the network arc-consistent again, starting
+            # from x_i as the only new singleton
+            cn.push_level()
+            cn.assign_value(i, v)
+            if propagate(cn, i) and MAC(cn, i + 1, A):
+                return True
+
+            # Restore the pruned values and remove current value
+            cn.pop_level()
+            A.pop()
+
+        # If all values in D_i are exhausted we fail
+        return False
+
+    def propagate(cn, i):
+        # AllDifferent constraints are filtered as a whole when there are any
+        if cn.get_alldiff_constraints():
+            return propagate_alldiff(cn, [i], trail=True)
+        return propagate_ne(cn, deque([i]), trail=True)
+
+    def forward_check(cn, i, v):
+        for j in later_peers[i]:
+            if cn.remove_value(j, v) and cn.domain_size(j) == 0:
+                return False
+        return True
+
+    # Constraint checks only visit the constrained predecessors of each variable,
+    # while forward checking prunes the constrained successors
+    earlier_peers = [cn.get_earlier_peers(i) for i in range(cn.num_variables())]
+    later_peers = [
+        sorted(j for j in cn.get_vars_in_contraint_with(i) if j > i)
+        for i in range(cn.num_variables())
+    ]
+
     num_nodes = 0
+    node_limit = 0  # The limits are checked at the first node
+    value_rank = None if rng is None else random_ranks(all_values(cn), rng)
+    num_levels = cn.num_levels()
     assignment = []
     ConflictSet = [set() for _ in range(0, cn.num_variables())]
 
     print("Solving ...", st)
-    if st == SolverType.GTBT:
-        solved = GTB(cn, 0, assignment)
-    elif st == SolverType.BT:
-        solved = BT(cn, 0, assignment)
-    elif st == SolverType.BJ:
-        (solved, _) = BJ(cn, 0, assignment)
-    elif st == SolverType.CBJ:
-        (solved, _) = CBJ(cn, 0, assignment, ConflictSet)
+    static = (
+        var_order == VariableOrdering.STATIC and val_order == ValueOrdering.ASCENDING
+    )
+    assert nogoods is None or (st == SolverType.CBJ and static), 'CBJ learns nogoods'
+    if not static:
+        return solve_dynamic_order(
+            st, cn, var_order, val_order, limits, rng, on_solution
+        )
+    try:
+        if st == SolverType.GTBT:
+            solved = GTB(cn, 0, assignment)
+        elif st == SolverType.BT:
+            solved = BT(cn, 0, assignment)
+        elif st == SolverType.BJ:
+            (solved, _) = BJ(cn, 0, assignment)
+        elif st == SolverType.CBJ:
+            (solved, _) = CBJ(cn, 0, assignment, ConflictSet)
+        elif st == SolverType.GTBT_IT:
+            yield from GTB_iter(cn, assignment)
+        elif st == SolverType.BT_IT:
+            yield from BT_iter(cn, assignment)
+        elif st == SolverType.BJ_IT:
+            yield from BJ_iter(cn, assignment)
+        elif st == SolverType.CBJ_IT:
+            yield from CBJ_iter(cn, assignment, ConflictSet)
+        elif st == SolverType.FC:
+            FC(cn, 0, assignment)
+        elif st == SolverType.SAT:
+            (assignment, num_nodes) = sat.solve_network(
+                cn, limits.max_nodes, rng, on_solution, limits.stopped
+            )
+        elif st == SolverType.MAC:
+            cn.push_level()
+            if cn.get_alldiff_constraints():
+                consistent = make_arc_consistent_alldiff(cn, trail=True)
+            else:
+                consistent = make_arc_consistent_ne(cn, trail=True)
+            if consistent:
+                MAC(cn, 0, assignment)
+    except _LimitReached:
+        assignment = None
+        num_nodes -= 1  # The node reaching the limit was not expanded
+
+    # Undo the pruning of a look-ahead search that stopped at a solution
+    while cn.num_levels() > num_levels:
+        cn.pop_level()
     return (assignment, num_nodes)
+
+
+def solve_dynamic_order(
+    st,
+    cn,
+    var_order,
+    val_order=ValueOrdering.ASCENDING,
+    limits=None,
+    rng=None,
+    on_solution=None,
+):
+    """
+    Solve cn with BT, BJ or CBJ (st), choosing the variable to assign at each node
+    with the var_order heuristic and the order of its values with val_order.
+    Backjumps and conflict sets refer to depths in the search tree instead of
+    variable indices. Returns (assignment, nodes) like solve, also when one of the
+    SearchLimits limits is reached.
+    With rng the ties of var_order go to a variable drawn at random for this run
+    instead of the lowest index, and the values are ordered as in solve.
+    Solutions are passed to on_solution as in solve.
+    """
+    # pylint: disable=too-many-statements, too-many-locals
+    assert st in (SolverType.BT, SolverType.BJ, SolverType.CBJ)
+
+    n = cn.num_variables()
+    last = n - 1
+    peers = [sorted(cn.get_vars_in_contraint_with(x)) for x in range(n)]
+    domains = [cn.get_sorted_domain(x) for x in range(n)]
+
+    # The random priorities of the run breaking ties between variables and values
+    var_rank = value_rank = None
+    if rng is not None:
+        var_rank = random_ranks(range(n), rng)
+        value_rank = random_ranks(all_values(cn), rng)
+        for d in domains:
+            d.sort(key=value_rank.__getitem__)
+
+    # The value of each assigned variable and the depth each selected variable
+    # is assigned at (-1 while unselected)
+    values = [None] * n
+    depth_of = [-1] * n
+
+    # For each x and v in D_x the number of assigned neighbours of x with value v,
+    # the number of values in D_x taken by one of them and the number of
+    # unassigned neighbours of x, all maintained on (un)assignment
+    conflicts = [dict.fromkeys(d, 0) for d in domains]
+    num_taken = [0] * n
+    free_degree = [len(p) for p in peers]
+
+    # Conflict weights of the constraints for dom/wdeg, all start at 1
+    weights = {}
+
+    # For least-constraining-value, for each x and v in D_x the number of unassigned
+    # neighbours of x for which v is still open (in their domain and not taken)
+    lcv = val_order == ValueOrdering.LCV
+    if lcv:
+        pruned = [
+            {v: sum(1 for y in peers[x] if v in conflicts[y]) for v in domains[x]}
+            for x in range(n)
+        ]
+
+    def update_pruned(x, v, delta):
+        for y in peers[x]:
+            p = pruned[y]
+            if v in p:
+                p[v] += delta
+
+    def assign(x, v):
+        if lcv:
+            # The open values of x no longer count for its neighbours
+            c = conflicts[x]
+            for u in domains[x]:
+                if not c[u]:
+                    update_pruned(x, u, -1)
+        values[x] = v
+        for y in peers[x]:
+            free_degree[y] -= 1
+            c = conflicts[y]
+            if v in c:
+                c[v] += 1
+                if c[v] == 1:
+                    num_taken[y] += 1
+                    if lcv and values[y] is None:
+                        update_pruned(y, v, -1)
+
+    def unassign(x, v):
+        values[x] = None
+        for y in peers[x]:
+            free_degree[y] += 1
+            c = conflicts[y]
+            if v in c:
+                c[v] -= 1
+                if c[v] == 0:
+                    num_taken[y] -= 1
+                    if lcv and values[y] is None:
+                        update_pruned(y, v, 1)
+        if lcv:
+            c = conflicts[x]
+            for u in domains[x]:
+                if not c[u]:
+                    update_pruned(x, u, 1)
+
+    def ordered_values(x):
+        if lcv:
+            p = pruned[x]
+            if value_rank is not None:
+                return sorted(domains[x], key=lambda v: (p[v], value_rank[v]))
+            return sorted(domains[x], key=lambda v: (p[v], v))
+        return domains[x]
+
+    def remaining(x):
+        return len(domains[x]) - num_taken[x]
+
+    def weighted_degree(x):
+        return sum(
+            weights.get(cn.ordered_pair(x, y), 1) for y in peers[x] if values[y] is None
+        )
+
+    def mrv_degree(x):
+        return (remaining(x), -free_degree[x])
+
+    def dom_wdeg(x):
+        wdeg = weighted_degree(x)
+        return remaining(x) / wdeg if wdeg else remaining(x)
+
+    if var_order == VariableOrdering.STATIC:
+        key = None
+    elif var_order == VariableOrdering.MRV:
+        key = remaining
+    elif var_order == VariableOrdering.MRV_DEGREE:
+        key = mrv_degree
+    elif var_order == VariableOrdering.DOM_WDEG:
+        key = dom_wdeg
+
+    def select():
+        # The unselected variable with the lowest key, ties go to the lowest index
+        # (or rank)
+        best, best_key = -1, None
+        for x in range(n):
+            if depth_of[x] < 0:
+                if key is None:
+                    return x
+                k = key(x)
+                if var_rank is not None:
+                    k = (k, var_rank[x])
+                if best < 0 or k < best_key:
+                    best, best_key = x, k
+        return best
+
+    def conflict_depth(x, v, d):
+        # The lowest depth of an assigned neighbour of x with value v, or d if none
+        if not conflicts[x][v]:
+            return d
+        h, culprit = d, None
+        for y in peers[x]:
+            if values[y] == v and depth_of[y] < h:
+                h, culprit = depth_of[y], y
+        if var_order == VariableOrdering.DOM_WDEG:
+            pair = cn.ordered_pair(x, culprit)
+            weights[pair] = weights.get(pair, 1) + 1
+        return h
+
+    def found():
+        # Reports the solution, returns True if the search should stop at it
+        return on_solution is None or on_solution(list(values))
+
+    def BT(d):
+        # Node counter
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+
+        x = select()
+        depth_of[x] = d
+        for v in ordered_values(x):
+            if conflict_depth(x, v, d) == d:
+                assign(x, v)
+                if found() if d == last else BT(d + 1):
+                    return True
+                unassign(x, v)
+        depth_of[x] = -1
+        return False
+
+    def BJ(d):
+        # Node counter
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+
+        x = select()
+        depth_of[x] = d
+        return_depth = -1
+        for v in ordered_values(x):
+            max_check_lvl = conflict_depth(x, v, d)
+            if max_check_lvl == d and d == last:
+                assign(x, v)
+                if found():
+                    return True, -1
+                unassign(x, v)
+
+                # Searching on, no depth above may be jumped over
+                max_check_lvl = d - 1
+            elif max_check_lvl == d:
+                assign(x, v)
+                solved, max_check_lvl = BJ(d + 1)
+                if solved:
+                    return True, -1
+                unassign(x, v)
+
+                # Jump over the current node
+                if max_check_lvl < d:
+                    depth_of[x] = -1
+                    return False, max_check_lvl
+            return_depth = max(return_depth, max_check_lvl)
+        depth_of[x] = -1
+        return False, return_depth
+
+    def CBJ(d, CS):
+        # Node counter
+        nonlocal num_nodes, node_limit
+        num_nodes += 1
+        if num_nodes > node_limit:
+            node_limit = limits.next_check(num_nodes)
+
+        x = select()
+        depth_of[x] = d
+        CS[d] = {-1}
+        for v in ordered_values(x):
+            h = conflict_depth(x, v, d)
+            if h < d:
+                CS[d].add(h)
+                continue
+            assign(x, v)
+            if d == last:
+                if found():
+                    return True, -1
+                unassign(x, v)
+
+                # Searching on, the solution depends on all depths above
+                CS[d].update(range(d))
+                continue
+            solved, r_depth = CBJ(d + 1, CS)
+            if solved:
+                return True, -1
+            unassign(x, v)
+
+            # Jump over the current node
+            if r_depth < d:
+                depth_of[x] = -1
+                return False, r_depth
+
+        # Pass the conflict set up to the deepest depth in it
+        r_depth = max(CS[d])
+        CS[r_depth].update(CS[d])
+        CS[r_depth].discard(r_depth)
+        depth_of[x] = -1
+        return False, r_depth
+
+    num_nodes = 0
+    if limits is None:
+        limits = SearchLimits()
+    node_limit = 0
+    try:
+        if st == SolverType.BT:
+            solved = BT(0)
+        elif st == SolverType.BJ:
+            (solved, _) = BJ(0)
+        elif st == SolverType.CBJ:
+            (solved, _) = CBJ(0, [set() for _ in range(0, n)])
+    except _LimitReached:
+        return (None, num_nodes - 1)
+    return (values if solved else [], num_nodes)
+
+
+def solve_with_budget(
+    st,
+    cn,
+    max_nodes=None,
+    timeout=None,
+    token=None,
+    var_order=VariableOrdering.STATIC,
+    val_order=ValueOrdering.ASCENDING,
+):
+    """
+    Solve cn like solve, giving up after max_nodes nodes or timeout seconds or once
+    the CancellationToken token is cancelled. Returns (status, assignment, nodes),
+    where status is a SolveStatus and the assignment is None unless it is SOLVED.
+    """
+    (assignment, nodes) = solve(
+        st, cn, var_order, val_order, max_nodes=max_nodes, timeout=timeout, token=token
+    )
+    status = search_status(assignment, token)
+    return (status, assignment if status == SolveStatus.SOLVED else None, nodes)
+
+
+def search_status(assignment, token=None):
+    """
+    Returns the SolveStatus of a search returning assignment with the token.
+    """
+    if assignment:
+        return SolveStatus.SOLVED
+    if assignment is not None:
+        return SolveStatus.UNSATISFIABLE
+    if token is not None and token.is_cancelled():
+        return SolveStatus.CANCELLED
+    return SolveStatus.BUDGET_EXHAUSTED
+
+
+def solve_steps(st, cn, nodes_per_step=1000, max_nodes=None, timeout=None, token=None):
+    """
+    Solve cn with BT, BJ or CBJ (st, or another explicit stack solver type) a few
+    nodes at a time. Generates a SearchSnapshot after the first node and then every
+    nodes_per_step nodes, pausing the search until the next one is asked for, so
+    many searches can be interleaved in one thread. The last snapshot has the
+    status of the search (see solve_with_budget) and the solution if solved.
+    """
+    st = ITERATIVE_SOLVER_TYPES.get(st, st)
+    assert st in ITERATIVE_SOLVER_TYPES.values(), 'Only explicit stack solvers step'
+    assert nodes_per_step > 0
+    limits = SearchLimits(max_nodes, timeout, token, nodes_per_step)
+    (assignment, nodes) = yield from _search(
+        st,
+        cn,
+        VariableOrdering.STATIC,
+        ValueOrdering.ASCENDING,
+        None,
+        limits,
+        None,
+        None,
+    )
+    status = search_status(assignment, token)
+    if status != SolveStatus.SOLVED:
+        assignment = None
+    yield SearchSnapshot(len(assignment or []), assignment, nodes, status)
+
+
+def restart_budgets(schedule, base, growth=2.0):
+    """
+    Generates the node budgets of the runs of a restart schedule.
+    """
+    k = 1
+    while True:
+        if schedule == RestartSchedule.LUBY:
+            yield base * sat.luby(k)
+        else:
+            yield int(base * growth ** (k - 1))
+        k += 1
+
+
+def all_values(cn):
+    """
+    Returns the set of values in the domains of cn.
+    """
+    return set().union(*(cn.get_domain(i) for i in range(cn.num_variables())))
+
+
+def random_ranks(items, rng):
+    """
+    Returns a dict giving each of the items a distinct rank in a random order.
+    """
+    items = sorted(items)
+    rng.shuffle(items)
+    return {item: rank for rank, item in enumerate(items)}
+
+
+def solve_with_restarts(
+    st,
+    cn,
+    schedule=RestartSchedule.LUBY,
+    base=100,
+    seed=None,
+    var_order=VariableOrdering.STATIC,
+    val_order=ValueOrdering.ASCENDING,
+    growth=2.0,
+    timeout=None,
+    token=None,
+):
+    """
+    Solve cn with any solver type st, restarting it with the node budgets of
+    schedule (see restart_budgets). Each run breaks the ties of the variable and
+    value orderings at random (see the rng argument of solve), drawing from a
+    generator seeded with seed. The static variable order is kept.
+    Returns (assignment, nodes) like solve, where nodes is summed over all runs.
+    With timeout or token the restarts give up like solve, returning None.
+    """
+    rng = random.Random(seed)
+    limits = SearchLimits(timeout=timeout, token=token)
+    total_nodes = 0
+    for budget in restart_budgets(schedule, base, growth):
+        if limits.deadline is not None:
+            timeout = max(limits.deadline - timer(), 0)
+        (assignment, nodes) = solve(
+            st,
+            cn,
+            var_order,
+            val_order,
+            max_nodes=budget,
+            rng=rng,
+            timeout=timeout,
+            token=token,
+        )
+        total_nodes += nodes
+        if assignment is not None or limits.stopped():
+            return (assignment, total_nodes)
+
+
+def count_solutions(
+    st,
+    cn,
+    limit=None,
+    var_order=VariableOrdering.STATIC,
+    val_order=ValueOrdering.ASCENDING,
+    solutions=None,
+):
+    """
+    Counts the solutions of cn with the solver type st, stopping once limit of them
+    are found (a limit of 2 tells whether the solution is unique). The solutions are
+    appended to the list solutions if one is given.
+    Returns (count, nodes), where nodes is the number of nodes of the whole search.
+    """
+    assert limit is None or limit > 0
+    count = 0
+
+    def on_solution(assignment):
+        nonlocal count
+        count += 1
+        if solutions is not None:
+            solutions.append(assignment)
+        return count == limit
+
+    (_, nodes) = solve(st, cn, var_order, val_order, on_solution=on_solution)
+    return (count, nodes)
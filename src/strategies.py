@@ -0,0 +1,226 @@
+#
+# Informed Search Methods
+#
+# Propagation of Sudoku networks with the rules human solvers use.
+#
+
+from collections import deque
+from itertools import combinations
+
+try:
+    from . import sudoku
+except ImportError:  # Run from within the src folder
+    import sudoku
+
+
+# The 27 units (rows, columns, boxes) and for each cell its three units, its box
+# and its 20 peers
+UNITS = sudoku.collect_units()
+CELL_UNITS = [
+    tuple(u for u, cells in enumerate(UNITS) if c in cells) for c in range(81)
+]
+BOX_OF = [units[2] for units in CELL_UNITS]
+PEERS = [
+    sorted({p for u in CELL_UNITS[c] for p in UNITS[u]} - {c}) for c in range(81)
+]
+
+# The rules in the order they are tried, cheapest first
+RULES = (
+    'naked single',
+    'hidden single',
+    'naked pair',
+    'hidden pair',
+    'pointing',
+    'box-line',
+    'naked triple',
+    'hidden triple',
+)
+
+
+class StrategyEngine:
+    """
+    Applies the rules in RULES to the domains of a Sudoku network until none of them
+    removes a value. The number of cells in each unit that have a value in their
+    domain is maintained on every removal, which makes hidden singles a lookup and
+    limits the other rules to the values that can take part in them.
+    """
+
+    def __init__(self, cn):
+        """
+        Constructor: cn is a network of the 81 cells with domains 1-9.
+        """
+        assert cn.num_variables() == 81
+        self.candidates = [set(cn.get_domain(c)) for c in range(81)]
+        self.counts = [[0] * 10 for _ in UNITS]
+        for u, cells in enumerate(UNITS):
+            for c in cells:
+                for v in self.candidates[c]:
+                    self.counts[u][v] += 1
+        self.given = [len(d) == 1 for d in self.candidates]
+        self.placed = [False] * 81
+        self.singles = deque(c for c in range(81) if len(self.candidates[c]) == 1)
+        self.fired = dict.fromkeys(RULES, 0)  # Number of deductions of each rule
+        self.ok = all(self.candidates)
+
+    def remove(self, cell, v):
+        """
+        Removes v from the domain of cell. Returns True if it was there.
+        """
+        domain = self.candidates[cell]
+        if v not in domain:
+            return False
+        domain.remove(v)
+        for u in CELL_UNITS[cell]:
+            self.counts[u][v] -= 1
+            if self.counts[u][v] == 0:
+                self.ok = False  # No cell of the unit can take v
+        if len(domain) == 1:
+            self.singles.append(cell)
+        elif not domain:
+            self.ok = False
+        return True
+
+    def restrict(self, cell, values):
+        """
+        Removes every value not in values from the domain of cell. Returns True if
+        any was removed.
+        """
+        removed = False
+        for v in sorted(self.candidates[cell] - values):
+            removed |= self.remove(cell, v)
+        return removed
+
+    def run(self):
+        """
+        Applies the rules to a fixpoint, always retrying the cheaper ones first after
+        a deduction. Returns False if a contradiction was found, otherwise True.
+        """
+        rules = (
+            self.hidden_single,
+            lambda: self.naked_subset(2, 'naked pair'),
+            lambda: self.hidden_subset(2, 'hidden pair'),
+            self.pointing,
+            self.box_line,
+            lambda: self.naked_subset(3, 'naked triple'),
+            lambda: self.hidden_subset(3, 'hidden triple'),
+        )
+        while self.ok:
+            if self.singles:
+                self.naked_single(self.singles.popleft())
+            elif not any(rule() for rule in rules):
+                break
+        return self.ok
+
+    def naked_single(self, cell):
+        if self.placed[cell] or not self.candidates[cell]:
+            return
+        self.placed[cell] = True
+        (v,) = self.candidates[cell]
+        removed = False
+        for peer in PEERS[cell]:
+            removed |= self.remove(peer, v)
+        if removed and not self.given[cell]:
+            self.fired['naked single'] += 1
+
+    def hidden_single(self):
+        for u, cells in enumerate(UNITS):
+            counts = self.counts[u]
+            for v in range(1, 10):
+                if counts[v] == 1:
+                    cell = next(c for c in cells if v in self.candidates[c])
+                    if self.restrict(cell, {v}):
+                        self.fired['hidden single'] += 1
+                        return True
+        return False
+
+    def naked_subset(self, k, rule):
+        # k unsolved cells of a unit with only k values between them
+        for cells in UNITS:
+            unsolved = [c for c in cells if 1 < len(self.candidates[c]) <= k]
+            for subset in combinations(unsolved, k):
+                values = set().union(*(self.candidates[c] for c in subset))
+                if len(values) != k:
+                    continue
+                removed = False
+                for c in cells:
+                    if c not in subset:
+                        for v in values:
+                            removed |= self.remove(c, v)
+                if removed:
+                    self.fired[rule] += 1
+                    return True
+        return False
+
+    def hidden_subset(self, k, rule):
+        # k values of a unit that only k of its cells can take
+        for u, cells in enumerate(UNITS):
+            counts = self.counts[u]
+            values = [v for v in range(1, 10) if 2 <= counts[v] <= k]
+            for subset in combinations(values, k):
+                where = {c for c in cells for v in subset if v in self.candidates[c]}
+                if len(where) != k:
+                    continue
+                removed = False
+                for c in where:
+                    removed |= self.restrict(c, set(subset))
+                if removed:
+                    self.fired[rule] += 1
+                    return True
+        return False
+
+    def pointing(self):
+        # The cells of a box that can take v all lie in one row or column
+        for u in range(18, 27):
+            for v in range(1, 10):
+                if not 2 <= self.counts[u][v] <= 3:
+                    continue
+                where = [c for c in UNITS[u] if v in self.candidates[c]]
+                for line in (CELL_UNITS[where[0]][0], CELL_UNITS[where[0]][1]):
+                    if all(line in CELL_UNITS[c] for c in where) and self.eliminate(
+                        v, UNITS[line], UNITS[u], 'pointing'
+                    ):
+                        return True
+        return False
+
+    def box_line(self):
+        # The cells of a row or column that can take v all lie in one box
+        for u in range(18):
+            for v in range(1, 10):
+                if not 2 <= self.counts[u][v] <= 3:
+                    continue
+                where = [c for c in UNITS[u] if v in self.candidates[c]]
+                box = BOX_OF[where[0]]
+                if all(BOX_OF[c] == box for c in where) and self.eliminate(
+                    v, UNITS[box], UNITS[u], 'box-line'
+                ):
+                    return True
+        return False
+
+    def eliminate(self, v, cells, keep, rule):
+        # Removes v from the cells not in keep
+        removed = False
+        for c in cells:
+            if c not in keep:
+                removed |= self.remove(c, v)
+        if removed:
+            self.fired[rule] += 1
+        return removed
+
+
+def apply_strategies(cn, trail=False):
+    """
+    Reduces the domains of the Sudoku network cn with the StrategyEngine rules.
+    With trail the removals are recorded on the trail of cn.
+    Returns a tuple (consistent, fired), where the former is False if a contradiction
+    was found and the latter maps each rule to its number of deductions.
+    """
+    engine = StrategyEngine(cn)
+    consistent = engine.run()
+    for c in range(81):
+        if trail:
+            for v in cn.get_sorted_domain(c):
+                if v not in engine.candidates[c]:
+                    cn.remove_value(c, v)
+        else:
+            cn.set_domain(c, engine.candidates[c])
+    return (consistent, engine.fired)
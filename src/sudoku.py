@@ -48,13 +48,12 @@ def read_puzzles(name):
 def write_puzzle_constraints(name, constraints):
     """
     Writes the constraints to a file in a format consistent with 'SimpleCSP' format.
+    A constraint over more than two variables is an AllDifferent constraint.
     """
     with open(name, 'w') as f:
         for c in constraints:
             f.write('(')
-            f.write(str(c[0]))
-            f.write(',')
-            f.write(str(c[1]))
+            f.write(','.join(map(str, c)))
             f.write(')\n')
 
 
@@ -95,7 +94,7 @@ def generate_domains_single(puzzle):
     return [{x} if x else _ALL for x in puzzle]
 
 
-def generate_constraints():
+def generate_constraints(alldiff=False):
     """
     The routine returns a list of non-equal constraints representing which pairs of
     cells cannot take the same value. Each constraint is represented as a tuple of two
@@ -113,10 +112,51 @@ def generate_constraints():
     54 55 56 57 58 59 60 61 62
     63 64 65 66 67 68 69 70 71
     72 73 74 75 76 77 78 79 80
+
+    With alldiff it instead returns the 27 AllDifferent constraints of the rows,
+    columns and boxes, each a tuple of the 9 cells of the unit.
     """
+    if alldiff:
+        return collect_units()
     return list(chain(collect_rows(), collect_columns(), collect_blocks()))
 
 
+def generate_cover_rows(puzzle):
+    """
+    The routine returns the rows of the exact cover problem of a puzzle, one for each
+    digit a cell can take (only the given digit for a filled cell). Each row is a tuple
+    (cell, digit, columns) where columns lists the four of the 324 constraint columns
+    it covers:
+      - 0-80 cell: the cell has a digit.
+      - 81-161 row-digit: the row of the cell has the digit.
+      - 162-242 column-digit: the column of the cell has the digit.
+      - 243-323 box-digit: the box of the cell has the digit.
+    """
+    rows = []
+    for cell, given in enumerate(puzzle):
+        r, c = divmod(cell, 9)
+        b = (r // 3) * 3 + c // 3
+        for digit in [given] if given else range(1, 10):
+            d = digit - 1
+            rows.append(
+                (cell, digit, (cell, 81 + r * 9 + d, 162 + c * 9 + d, 243 + b * 9 + d))
+            )
+    return rows
+
+
+def collect_units():
+    """Collect the cells of every row, column and box, in that order.
+    """
+    rows = [tuple(range(r * 9, r * 9 + 9)) for r in range(9)]
+    columns = [tuple(range(c, 81, 9)) for c in range(9)]
+    boxes = [
+        tuple(r * 9 + c for r in range(br, br + 3) for c in range(bc, bc + 3))
+        for br in range(0, 9, 3)
+        for bc in range(0, 9, 3)
+    ]
+    return rows + columns + boxes
+
+
 def collect_rows():
     """Collect all elements along with any element to its right.
     """
@@ -210,15 +250,20 @@ def main():
     'soduko.txt' is the default expected input file name, but it can be overwritten by
     specifying an alternative name as a command-line argument.
 
-    Usage:  sudoku [filename]
+    Usage:  sudoku [--alldiff] [filename]
     Reads Sudoku puzzle-instances from a file and outputs 'SimpleCSP' compatible
     constraints- and domains files, called 'filename_cst.txt' and 'filename_dom.txt',
-    respectively.
+    respectively. With --alldiff the constraints are the 27 AllDifferent constraints
+    of the units instead of the pairwise not-equal constraints.
     """
+    args = sys.argv[1:]
+    alldiff = '--alldiff' in args
+    if alldiff:
+        args.remove('--alldiff')
     name = 'sudoku'
     input_puzzle_file = name + '.txt'
-    if len(sys.argv) == 2:
-        input_puzzle_file = sys.argv[1]
+    if len(args) == 1:
+        input_puzzle_file = args[0]
         name = Path(input_puzzle_file).stem
         assert len(name) > 0
     output_domains_file = name + "_dom.txt"
@@ -233,7 +278,7 @@ def main():
     write_puzzles_domains(name + "_dom.txt", domains)
 
     print('Generating and writing constraints to file', output_constraints_file)
-    constraints = generate_constraints()
+    constraints = generate_constraints(alldiff)
     write_puzzle_constraints(output_constraints_file, constraints)
 
 
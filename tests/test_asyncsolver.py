@@ -0,0 +1,120 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.asyncsolver import AsyncSolver, solve_async
+from src.constraintnetwork import NetworkTemplate
+from src.solvers import CancellationToken, SolverType, VariableOrdering, solve
+from .utils import (
+    ALL_CONSTRAINTS_4X4,
+    sudoku_csp_3,
+    csp_from_4x4_str,
+    sud_4x4_to_domains,
+)
+
+
+async def cancel_after(coroutine, delay):
+    task = asyncio.ensure_future(coroutine)
+    await asyncio.sleep(delay)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        return True
+    return False
+
+
+def test_solve_async():
+    assert asyncio.run(solve_async(SolverType.CBJ, sudoku_csp_3())) == solve(
+        SolverType.CBJ, sudoku_csp_3()
+    )
+    csp = csp_from_4x4_str("1000010000000000")
+    assert asyncio.run(solve_async(SolverType.BT, csp)) == ([], 29)
+
+    # Generate-and-test would enumerate billions of assignments of the empty board,
+    # cancelling the task stops the search
+    start = time.time()
+    search = solve_async(SolverType.GTBT, csp_from_4x4_str("0" * 16))
+    assert asyncio.run(cancel_after(search, 0.1))
+    assert time.time() - start < 2
+
+    # The searches in threads solve copies of one network at the same time
+    async def solve_all(csp, solver_types):
+        return await asyncio.gather(*(solve_async(st, csp) for st in solver_types))
+
+    csp = sudoku_csp_3()
+    solver_types = [SolverType.FC, SolverType.MAC] * 3
+    results = asyncio.run(solve_all(csp, solver_types))
+    assert results == [solve(st, sudoku_csp_3()) for st in solver_types]
+    assert str(csp) == str(sudoku_csp_3()) and csp.num_levels() == 0
+
+
+def test_solve_async_processes():
+    with ProcessPoolExecutor(1) as executor:
+        csp = csp_from_4x4_str("1000010000000000")
+        assert asyncio.run(solve_async(SolverType.BT, csp, executor)) == ([], 29)
+
+        # A shared token is made for the search in the worker process
+        start = time.time()
+        search = solve_async(SolverType.GTBT, csp_from_4x4_str("0" * 16), executor)
+        assert asyncio.run(cancel_after(search, 0.5))
+        assert time.time() - start < 5
+
+        # Which a plain token could not cancel
+        search = solve_async(SolverType.BT, csp, executor, CancellationToken())
+        with pytest.raises(AssertionError):
+            asyncio.run(search)
+
+
+def test_async_solver():
+    csps = [
+        csp_from_4x4_str(s) for s in ("0" * 16, "1000010000000000", "3000000000000100")
+    ]
+
+    async def main(solver):
+        results = await asyncio.gather(
+            *(solver.solve(SolverType.BT, csp, VariableOrdering.MRV) for csp in csps)
+        )
+        assert results == [
+            solve(SolverType.BT, csp, VariableOrdering.MRV) for csp in csps
+        ]
+
+        # At most two searches run at a time, the third waits for one of them
+        start = time.time()
+        results = await asyncio.gather(
+            *(
+                solver.solve(SolverType.GTBT, csp_from_4x4_str("0" * 16), timeout=0.2)
+                for _ in range(3)
+            )
+        )
+        assert all(assignment is None for assignment, _ in results)
+        assert 0.4 <= time.time() - start < 2
+
+    solver = AsyncSolver(max_concurrent=2)
+    asyncio.run(main(solver))
+    solver.close()
+
+
+def test_async_solver_processes():
+    template = NetworkTemplate(16, ALL_CONSTRAINTS_4X4)
+    domains = sud_4x4_to_domains(map(int, "3000000000000100"))
+
+    async def main(solver):
+        result = await solver.solve_instance(SolverType.BT, template, domains)
+        assert result == solve(SolverType.BT, csp_from_4x4_str("3000000000000100"))
+        result = await solver.solve_instance(SolverType.BT, template, domains, ac=True)
+        csp = csp_from_4x4_str("3000000000000100")
+        assert result[0] == solve(SolverType.MAC, csp)[0]
+
+        # The token is shared with the worker process
+        start = time.time()
+        search = solver.solve(SolverType.GTBT, csp_from_4x4_str("0" * 16))
+        assert await cancel_after(search, 0.5)
+        assert time.time() - start < 5
+
+    with ProcessPoolExecutor(2) as executor:
+        solver = AsyncSolver(executor, 2)
+        asyncio.run(main(solver))
+        solver.close()
@@ -0,0 +1,156 @@
+import pytest
+from src.constraintnetwork import (
+    ConstraintNetwork,
+    BitsetConstraintNetwork,
+    NetworkTemplate,
+)
+from src.sudoku import generate_constraints, generate_domains_single
+from .utils import sudoku_csp_2
+
+
+x2 = """.6....91.
+2.3.1568.
+...6.3254
+.2...13..
+15..4...6
+...2..89.
+..6..2.79
+4.7.9..62
+9127..5.."""
+
+
+def test_bitset_mask_helpers():
+    mask = BitsetConstraintNetwork.mask_from_values({9, 1, 4})
+    assert mask == 0b1000010010
+    assert BitsetConstraintNetwork.values_from_mask(mask) == [1, 4, 9]
+    assert BitsetConstraintNetwork.popcount(mask) == 3
+    assert BitsetConstraintNetwork.values_from_mask(0) == []
+
+
+def test_bitset_domains():
+    csp = BitsetConstraintNetwork(3)
+    csp.set_domain(0, {3, 1, 2})
+    assert csp.get_domain(0) == {1, 2, 3}
+    assert csp.get_sorted_domain(0) == [1, 2, 3]
+    assert csp.domain_size(0) == 3
+    assert csp.get_domain_mask(1) == 0
+    csp.set_domain_mask(0, csp.get_domain_mask(0) & ~(1 << 2))
+    assert csp.get_sorted_domain(0) == [1, 3]
+    assert csp.domain_size(0) == 2
+
+
+def test_bitset_matches_set_network():
+    a = sudoku_csp_2()
+    b = sudoku_csp_2(BitsetConstraintNetwork)
+    assert isinstance(a, ConstraintNetwork) and not a.bitset
+    assert b.bitset
+    for i in range(81):
+        assert a.get_domain(i) == b.get_domain(i)
+        assert a.get_sorted_domain(i) == b.get_sorted_domain(i)
+        assert a.domain_size(i) == b.domain_size(i)
+    assert str(a) == str(b)
+
+
+def test_earlier_peers():
+    csp = ConstraintNetwork(4)
+    for i, j in ((3, 1), (0, 3), (2, 3), (1, 2)):
+        csp.add_ne_constraint(i, j)
+    assert [csp.get_earlier_peers(i) for i in range(4)] == [[], [], [1], [0, 1, 2]]
+    csp.add_ne_constraint(0, 2)
+    assert csp.get_earlier_peers(2) == [0, 1]
+
+
+def test_adjacency():
+    csp = ConstraintNetwork(3)
+    csp.add_ne_constraint(2, 0)
+    assert csp.adjacency is None
+    assert csp.get_adjacency() == bytearray([0, 0, 1, 0, 0, 0, 1, 0, 0])
+    assert csp.constrained(0, 2) and csp.constrained(2, 0)
+    assert not csp.constrained(0, 1)
+    assert not csp.check_values(2, 0)(1, 1) and csp.check_values(2, 0)(1, 2)
+    assert csp.check_values(0, 1)(1, 1)
+    csp.add_ne_constraint(0, 1)
+    assert csp.adjacency is None
+    assert csp.constrained(1, 0)
+    assert not csp.check_values(0, 1)(1, 1)
+
+
+def test_copy():
+    template = NetworkTemplate(81, generate_constraints())
+    board = list(map(int, x2.replace("\n", "").replace(".", "0")))
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        domains = generate_domains_single(board)
+        for a in (sudoku_csp_2(network), template.instantiate(domains, network)):
+            a.push_level()
+            a.remove_value(0, 6)
+            b = a.copy()
+            assert isinstance(b, network) and str(a) == str(b)
+            b.remove_value(0, 5)
+            b.pop_level()
+            assert 5 in b.get_domain(0) and 6 in b.get_domain(0)
+            assert 5 in a.get_domain(0) and 6 not in a.get_domain(0)
+            assert a.num_levels() == 1 and b.num_levels() == 0
+            assert b.get_constraints() == a.get_constraints()
+            if a.template is None:
+                b.add_ne_constraint(0, 80)
+                assert 80 not in a.get_vars_in_contraint_with(0)
+
+
+def test_trail():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        csp = network(2)
+        csp.set_domain(0, {1, 2, 3})
+        csp.set_domain(1, {1, 2})
+        csp.push_level()
+        assert csp.remove_value(0, 2)
+        assert not csp.remove_value(0, 2)
+        csp.push_level()
+        assert csp.remove_value(1, 1)
+        assert csp.remove_value(0, 3)
+        assert csp.num_levels() == 2
+        assert csp.get_domain(0) == {1} and csp.get_domain(1) == {2}
+        csp.pop_level()
+        assert csp.get_domain(0) == {1, 3} and csp.get_domain(1) == {1, 2}
+        csp.pop_level()
+        assert csp.get_domain(0) == {1, 2, 3}
+        assert csp.num_levels() == 0
+
+
+def test_template():
+    template = NetworkTemplate(81, generate_constraints())
+    board = list(map(int, x2.replace("\n", "").replace(".", "0")))
+    expected = sudoku_csp_2()
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        a = template.instantiate(generate_domains_single(board), network)
+        b = template.instantiate(generate_domains_single(board), network)
+        assert isinstance(a, network)
+        assert a.get_constraints() == tuple(expected.get_constraints())
+        for i in range(81):
+            assert a.get_domain(i) == expected.get_domain(i)
+            peers = expected.get_vars_in_contraint_with(i)
+            assert a.get_vars_in_contraint_with(i) == peers
+            assert list(a.get_earlier_peers(i)) == expected.get_earlier_peers(i)
+        assert a.get_adjacency() == expected.get_adjacency()
+        a.push_level()
+        a.remove_value(1, 6)
+        assert 6 not in a.get_domain(1) and 6 in b.get_domain(1)
+        with pytest.raises(AssertionError):
+            a.add_ne_constraint(0, 80)
+
+
+def test_alldiff_constraints():
+    csp = ConstraintNetwork(81)
+    for c in generate_constraints(alldiff=True):
+        csp.add_alldiff_constraint(c)
+    assert len(csp.get_alldiff_constraints()) == 27
+    assert set(csp.get_constraints()) == set(generate_constraints())
+    assert len(csp.get_constraints()) == 810
+    assert csp.get_alldiff_constraints_with(10) == [1, 10, 18]
+    with pytest.raises(AssertionError):
+        csp.add_alldiff_constraint((0, 1, 1))
+
+    template = NetworkTemplate(81, generate_constraints(alldiff=True))
+    a = template.instantiate([{1, 2}] * 81)
+    assert a.get_alldiff_constraints() == tuple(csp.get_alldiff_constraints())
+    assert list(a.get_alldiff_constraints_with(10)) == [1, 10, 18]
+    assert set(a.get_constraints()) == set(generate_constraints())
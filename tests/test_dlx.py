@@ -0,0 +1,49 @@
+import pathlib
+from src.dlx import DancingLinks, solve_puzzle
+from .utils import get_all_from_file
+
+
+x3 = "359168274418273569762549318591482736837651492246937851625314987184795623973826145"
+p3 = "3...682..41.27.5.9....4.318591........7...4........851625.1....1.4.95.23..382...5"
+
+
+def to_board(s):
+    return list(map(int, s.replace(".", "0")))
+
+
+def is_solution(puzzle, sol):
+    assert len(sol) == 81
+    assert all(not p or p == s for p, s in zip(puzzle, sol))
+    for k in range(9):
+        assert len({sol[k * 9 + i] for i in range(9)}) == 9
+        assert len({sol[k + i * 9] for i in range(9)}) == 9
+        r, c = k // 3 * 3, k % 3 * 3
+        assert len({sol[(r + i // 3) * 9 + c + i % 3] for i in range(9)}) == 9
+    return True
+
+
+def test_exact_cover():
+    # Knuth's example, the only cover is rows 0, 3 and 4
+    rows = [[2, 4, 5], [0, 3, 6], [1, 2, 5], [0, 3], [1, 6], [3, 4, 6]]
+    chosen, _ = DancingLinks(7, rows).search()
+    assert sorted(chosen) == [0, 3, 4]
+    chosen, _ = DancingLinks(3, [[0, 1], [1, 2]]).search()
+    assert chosen == []
+
+
+def test_solve_puzzle():
+    sol, nodes = solve_puzzle(to_board(p3))
+    assert sol == to_board(x3)
+    assert nodes == 82
+
+    # Two 1s in the first row
+    sol, _ = solve_puzzle([1, 1] + [0] * 79)
+    assert sol == []
+
+
+def test_solve_puzzle_files():
+    path = pathlib.Path(__file__).parent.parent.joinpath("src", "puzzles")
+    for fname in ("sudoku_easy.txt", "sudoku_hard.txt", "custom.txt"):
+        for puzzle in get_all_from_file(fname, path):
+            sol, _ = solve_puzzle(puzzle)
+            assert is_solution(puzzle, sol)
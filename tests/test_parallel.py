@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+
+import pytest
+
+import src.parallel
+from src.parallel import (
+    Configuration,
+    run_configuration,
+    solve_portfolio,
+    extend_prefix,
+    split_prefixes,
+    untried_prefixes,
+    solve_parallel,
+    _search_prefix,
+)
+from src.solvers import SolverType, VariableOrdering, solve
+from .utils import sudoku_csp_3, sudoku_csp_5, csp_from_4x4_str
+
+
+def test_portfolio():
+    # Generate-and-test would enumerate billions of assignments of the empty
+    # board, it is cancelled once another configuration solves it
+    configs = [
+        Configuration(SolverType.GTBT),
+        Configuration(SolverType.BT, VariableOrdering.MRV, seed=1),
+    ]
+    config, sol, nodes = solve_portfolio(csp_from_4x4_str("0" * 16), configs)
+    assert config == configs[1]
+    assert (sol, nodes) == run_configuration(csp_from_4x4_str("0" * 16), config)
+
+    configs = [
+        Configuration(SolverType.MAC),
+        Configuration(SolverType.SAT),
+        Configuration(SolverType.CBJ, VariableOrdering.DOM_WDEG),
+    ]
+    config, sol, nodes = solve_portfolio(sudoku_csp_5(), configs)
+    assert config in configs
+    assert (sol, nodes) == run_configuration(sudoku_csp_5(), config)
+    assert sol == solve(SolverType.MAC, sudoku_csp_5())[0]
+
+    # A proof of unsatisfiability also finishes the portfolio
+    configs = [Configuration(SolverType.BT), Configuration(SolverType.SAT)]
+    config, sol, _ = solve_portfolio(csp_from_4x4_str("1000010000000000"), configs, 1)
+    assert config == configs[0] and sol == []
+
+
+def test_split_prefixes():
+    csp = csp_from_4x4_str("3000000000000100")
+    assert extend_prefix(csp, [3]) == [[3, 1], [3, 2], [3, 4]]
+    assert extend_prefix(csp, [3, 1, 2, 4]) == [[3, 1, 2, 4, 2], [3, 1, 2, 4, 4]]
+    prefixes, nodes = split_prefixes(csp, 4)
+    assert prefixes == [
+        [3, 1, 2], [3, 1, 4], [3, 2, 1], [3, 2, 4], [3, 4, 1], [3, 4, 2]
+    ]
+    assert nodes == 1 + 1 + 3
+    assert split_prefixes(csp_from_4x4_str("1000010000000000"), 10**6)[0] == []
+
+
+def test_untried_prefixes():
+    csp = csp_from_4x4_str("3000000000000100")
+    assert untried_prefixes(csp, [3, 1, 2], 1) == [[3, 1, 4], [3, 2], [3, 4]]
+    assert untried_prefixes(csp, [3, 1, 2], 2) == [[3, 1, 4]]
+    assert untried_prefixes(csp, [3, 4, 2], 1) == []
+    assert untried_prefixes(csp, [3], 1) == []
+
+
+def test_split_running_search():
+    # A search split at any of its nodes leaves the rest of the BT tree in the
+    # subproblems, so searching them takes the same nodes and finds the same solution
+    idle, stop = multiprocessing.Value('i', 1), multiprocessing.Event()
+    for c in ("1000010000000000", "3000000000000100", "0000000000000000"):
+        csp = csp_from_4x4_str(c)
+        for nodes_per_step in (1, 3):
+            (subproblems, total, splits) = ([[]], 0, 0)
+            while subproblems:
+                (sol, nodes, rest) = _search_prefix(
+                    SolverType.BT, csp, subproblems.pop(), nodes_per_step, idle, stop
+                )
+                total += nodes
+                if rest:
+                    splits += 1
+                    subproblems.extend(reversed(rest))
+                elif sol:
+                    break
+            assert (sol, total) == solve(SolverType.BT, csp)
+            assert splits > 0
+            assert csp.num_levels() == 0
+
+
+def test_parallel_tree_search():
+    # The workers search the same tree as BT, split or stolen, so proving
+    # unsatisfiability takes the same number of nodes
+    csp = csp_from_4x4_str("1000010000000000")
+    assert solve(SolverType.BT, csp)[1] == 29
+    for workers in (1, 2, 3):
+        assert solve_parallel(SolverType.BT, csp, workers) == ([], 29)
+        assert solve_parallel(SolverType.BT, csp, workers, 1, 1) == ([], 29)
+    for workers in (1, 2, 3):
+        for st in (SolverType.BT, SolverType.CBJ):
+            csp = csp_from_4x4_str("3000000000000100")
+            sol, _ = solve_parallel(st, csp, workers, split=2)
+            assert sol[0] == 3 and sol[13] == 1 and csp.consistent_all(sol)
+
+    sol, nodes = solve(SolverType.CBJ, sudoku_csp_3())
+    assert solve_parallel(SolverType.CBJ, sudoku_csp_3(), 1) == (sol, nodes)
+    assert solve_parallel(SolverType.CBJ, sudoku_csp_3(), 2)[0] == sol
+
+
+def fail(*args):
+    raise ValueError('no search today')
+
+
+def die(*args):
+    os._exit(1)
+
+
+def test_parallel_tree_search_failure(monkeypatch):
+    # A worker failing or dying ends the search instead of leaving the others
+    # waiting for its subproblems
+    for solve_steps, message in ((fail, 'no search today'), (die, 'died')):
+        monkeypatch.setattr(src.parallel.solvers, 'solve_steps', solve_steps)
+        with pytest.raises(RuntimeError, match=message):
+            solve_parallel(SolverType.CBJ, sudoku_csp_3(), 2)
@@ -0,0 +1,70 @@
+from src.sat import CDCLSolver, encode, luby, solve_network
+from src.constraintnetwork import ConstraintNetwork, BitsetConstraintNetwork
+from src.solvers import SolverType, solve
+from .utils import sudoku_csp_3, sudoku_csp_4
+
+
+x3 = "359168274418273569762549318591482736837651492246937851625314987184795623973826145"
+
+
+def test_luby():
+    expected = [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    assert [luby(k) for k in range(1, 16)] == expected
+
+
+def test_cdcl():
+    # (a or b) and (not a or b) and (a or not b)
+    solver = CDCLSolver(2)
+    for c in ([1, 2], [-1, 2], [1, -2]):
+        solver.add_clause(c)
+    assert solver.solve()
+    assert solver.value[1:] == [1, 1]
+
+    solver = CDCLSolver(2)
+    for c in ([1, 2], [-1, 2], [1, -2], [-1, -2]):
+        solver.add_clause(c)
+    assert not solver.solve()
+
+    solver = CDCLSolver(1)
+    solver.add_clause([])
+    assert not solver.solve()
+
+
+def test_encode():
+    csp = ConstraintNetwork(2)
+    csp.add_ne_constraint(0, 1)
+    csp.set_domain(0, {1, 2})
+    csp.set_domain(1, {2, 3})
+    solver, literals = encode(csp)
+    assert literals == [{1: 1, 2: 2}, {2: 3, 3: 4}]
+    assert sorted(map(sorted, solver.clauses)) == [
+        [-4, -3],
+        [-3, -2],
+        [-2, -1],
+        [1, 2],
+        [3, 4],
+    ]
+
+
+def test_solve_network():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        sol, _ = solve(SolverType.SAT, sudoku_csp_3(network))
+        assert sol == list(map(int, x3))
+        csp = sudoku_csp_4(network)
+        sol, _ = solve_network(csp)
+        assert all(sol[i] in csp.get_domain(i) for i in range(81))
+        assert all(sol[i] != sol[j] for i, j in csp.get_constraints())
+
+    # Four pigeons, three holes
+    csp = ConstraintNetwork(4)
+    for i in range(4):
+        csp.set_domain(i, {1, 2, 3})
+        for j in range(i):
+            csp.add_ne_constraint(i, j)
+    sol, nodes = solve_network(csp)
+    assert sol == []
+    assert nodes > 0
+
+    # Giving up after a number of decisions
+    assert solve_network(csp, 1) == (None, 1)
+    assert solve_network(sudoku_csp_4(), 0) == (None, 0)
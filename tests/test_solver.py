@@ -1,5 +1,32 @@
-from src.solvers import SolverType, solve, make_arc_consistent, revise
-from src.constraintnetwork import ConstraintNetwork
+import random
+import signal
+import threading
+import time
+from src.solvers import (
+    SolverType,
+    ITERATIVE_SOLVER_TYPES,
+    VariableOrdering,
+    ValueOrdering,
+    solve,
+    solve_dynamic_order,
+    make_arc_consistent,
+    make_arc_consistent_2001,
+    make_arc_consistent_ne,
+    make_arc_consistent_alldiff,
+    filter_alldiff,
+    NogoodStore,
+    RestartSchedule,
+    restart_budgets,
+    solve_with_restarts,
+    count_solutions,
+    SolveStatus,
+    CancellationToken,
+    solve_with_budget,
+    solve_steps,
+    revise,
+    revise_ne,
+)
+from src.constraintnetwork import ConstraintNetwork, BitsetConstraintNetwork
 from .utils import (
     ALL_CONSTRAINTS,
     sudoku_csp_1,
@@ -201,6 +228,146 @@ def test_revise():
     assert csp.get_domain(80) == {3, 8}
 
 
+def test_revise_bitset():
+    csp = sudoku_csp_1(BitsetConstraintNetwork)
+    assert revise(csp, 46, 45)
+    assert 7 not in csp.get_domain(46)
+    assert not revise(csp, 46, 45)
+    for j in csp.get_vars_in_contraint_with(46):
+        revise(csp, 46, j)
+    assert csp.get_domain(46) == {6}
+
+
+def test_revise_ne():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        csp = sudoku_csp_1(network)
+        assert revise_ne(csp, 46, 45)
+        assert 7 not in csp.get_domain(46)
+        assert not revise_ne(csp, 46, 45)
+        for j in csp.get_vars_in_contraint_with(46):
+            revise_ne(csp, 46, j)
+        assert csp.get_domain(46) == {6}
+
+        # D_80 is not a singleton so nothing is revised against it
+        csp = sudoku_csp_2(network)
+        assert len(csp.get_domain(80)) > 1
+        for i in csp.get_vars_in_contraint_with(80):
+            assert not revise_ne(csp, i, 80)
+
+
+def test_arc_consistency_ne():
+    for gen in (sudoku_csp_1, sudoku_csp_2, sudoku_csp_3, sudoku_csp_4, sudoku_csp_5):
+        a, b, c = gen(), gen(), gen(BitsetConstraintNetwork)
+        make_arc_consistent(a)
+        assert make_arc_consistent_ne(b)
+        assert make_arc_consistent_ne(c)
+        for i in range(81):
+            assert a.get_domain(i) == b.get_domain(i) == c.get_domain(i)
+
+    # Two 1s in the first row wipe out a domain
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        csp = csp_from_4x4_str("1100000000000000", network)
+        assert not make_arc_consistent_ne(csp)
+
+
+def test_filter_alldiff():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        # A naked pair {1, 2} leaves 3 for the third variable
+        csp = network(4)
+        csp.add_alldiff_constraint((0, 1, 2))
+        csp.set_domain(0, {1, 2})
+        csp.set_domain(1, {1, 2})
+        csp.set_domain(2, {1, 2, 3})
+        csp.set_domain(3, {1, 2, 3})
+        assert filter_alldiff(csp, (0, 1, 2)) == [2]
+        assert csp.get_domain(2) == {3}
+        assert filter_alldiff(csp, (0, 1, 2)) == []
+        assert csp.get_domain(3) == {1, 2, 3}
+
+        # With four values nothing is forced until variables 0 and 1 are down to
+        # the pair {1, 2}
+        csp = network(3)
+        csp.add_alldiff_constraint((0, 1, 2))
+        for i, d in enumerate(({1, 2, 3}, {1, 2, 3}, {1, 2, 3, 4})):
+            csp.set_domain(i, d)
+        csp.push_level()
+        assert filter_alldiff(csp, (0, 1, 2)) == []
+        csp.set_domain(1, {1, 2})
+        csp.set_domain(0, {1, 2})
+        assert filter_alldiff(csp, (0, 1, 2), trail=True) == [2]
+        assert csp.get_domain(2) == {3, 4}
+
+        # Three variables, two values
+        csp = network(3)
+        csp.add_alldiff_constraint((0, 1, 2))
+        for i in range(3):
+            csp.set_domain(i, {1, 2})
+        assert filter_alldiff(csp, (0, 1, 2)) is None
+
+
+def test_arc_consistency_alldiff():
+    for gen in (sudoku_csp_1, sudoku_csp_2, sudoku_csp_3, sudoku_csp_4, sudoku_csp_5):
+        a, b = gen(), gen(alldiff=True)
+        c = gen(BitsetConstraintNetwork, alldiff=True)
+        make_arc_consistent(a)
+        assert make_arc_consistent_alldiff(b)
+        assert make_arc_consistent_alldiff(c)
+        for i in range(81):
+            assert b.get_domain(i) == c.get_domain(i)
+            assert b.get_domain(i) <= a.get_domain(i)
+    # Stronger than AC-3 on the hard one
+    a, b = sudoku_csp_4(), sudoku_csp_4(alldiff=True)
+    make_arc_consistent(a)
+    make_arc_consistent_alldiff(b)
+    assert sum(map(len, b.domains)) < sum(map(len, a.domains))
+
+
+def test_mac_alldiff():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        for gen in (sudoku_csp_4, sudoku_csp_5):
+            sol, nodes = solve(SolverType.MAC, gen(network))
+            sol_alldiff, nodes_alldiff = solve(SolverType.MAC, gen(network, True))
+            assert sol == sol_alldiff
+            assert nodes_alldiff == 81 < nodes
+    # The search solvers use the not-equal decomposition
+    sol, _ = solve(SolverType.BT, sudoku_csp_5(alldiff=True))
+    assert sol == solve(SolverType.MAC, sudoku_csp_5())[0]
+
+
+def test_arc_consistency_bitset():
+    for gen in (sudoku_csp_1, sudoku_csp_2, sudoku_csp_3, sudoku_csp_4):
+        a, b = gen(), gen(BitsetConstraintNetwork)
+        make_arc_consistent(a)
+        make_arc_consistent(b)
+        for i in range(81):
+            assert a.get_domain(i) == b.get_domain(i)
+
+
+class CountingNetwork(ConstraintNetwork):
+    checks = 0
+
+    def check_values(self, i, j):
+        consistent = super().check_values(i, j)
+
+        def counted(vi, vj):
+            CountingNetwork.checks += 1
+            return consistent(vi, vj)
+
+        return counted
+
+
+def test_arc_consistency_2001():
+    for gen in (sudoku_csp_1, sudoku_csp_2, sudoku_csp_3, sudoku_csp_4, sudoku_csp_5):
+        a, b, c = gen(CountingNetwork), gen(), gen(BitsetConstraintNetwork)
+        CountingNetwork.checks = 0
+        make_arc_consistent(a)
+        checks = make_arc_consistent_2001(b)
+        assert checks == make_arc_consistent_2001(c)
+        assert 0 < checks < CountingNetwork.checks
+        for i in range(81):
+            assert a.get_domain(i) == b.get_domain(i) == c.get_domain(i)
+
+
 def test_arc_consistency():
     all_puzz = get_all_puzzles()
     all_puzz.extend([sudoku_csp_1(), sudoku_csp_2(), sudoku_csp_3(), sudoku_csp_4()])
@@ -219,6 +386,360 @@ def test_arc_consistency():
         assert len(csp.get_domain(i)) == 1
 
 
+def test_node_count_bitset():
+    for st in (SolverType.BT, SolverType.BJ, SolverType.CBJ):
+        a, b = sudoku_csp_5(), sudoku_csp_5(BitsetConstraintNetwork)
+        make_arc_consistent(a)
+        make_arc_consistent(b)
+        assert solve(st, a) == solve(st, b)
+
+
+def test_iterative_solvers():
+    for st, st_it in ITERATIVE_SOLVER_TYPES.items():
+        for c in ("0320200000010140", "3410020000200143"):
+            assert solve(st, csp_from_4x4_str(c)) == solve(st_it, csp_from_4x4_str(c))
+        if st != SolverType.GTBT:
+            a, b = sudoku_csp_5(), sudoku_csp_5()
+            make_arc_consistent(a)
+            make_arc_consistent(b)
+            assert solve(st, a) == solve(st_it, b)
+
+
+def test_iterative_solvers_deep_network():
+    # A chain of not-equal constraints far deeper than the recursion limit
+    n = 3000
+    csp = ConstraintNetwork(n)
+    for i in range(n - 1):
+        csp.add_ne_constraint(i, i + 1)
+        csp.set_domain(i, {1, 2})
+    csp.set_domain(n - 1, {1} if n % 2 else {2})
+    for st in (SolverType.BT_IT, SolverType.BJ_IT, SolverType.CBJ_IT):
+        sol, nodes = solve(st, csp)
+        assert sol == [1 + i % 2 for i in range(n)]
+        assert nodes == n
+
+
+def test_forward_checking():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        csp = sudoku_csp_5(network)
+        before = [csp.get_domain(i) for i in range(81)]
+        sol, n_fc = solve(SolverType.FC, csp)
+        assert csp.num_levels() == 0
+        assert [csp.get_domain(i) for i in range(81)] == before
+        sol_cbj, n_cbj = solve(SolverType.CBJ, csp)
+        assert n_fc == 2076 < n_cbj
+        assert sol == sol_cbj
+        assert all(x in csp.get_domain(i) for i, x in enumerate(sol))
+    for c, n in (("0320200000010140", 18), ("3410020000200143", 16)):
+        sol, nodes = solve(SolverType.FC, csp_from_4x4_str(c))
+        assert sol == solve(SolverType.BT, csp_from_4x4_str(c))[0]
+        assert nodes == n
+    # Unsolvable, x_1 is wiped out by the first assignment
+    csp = ConstraintNetwork(3)
+    csp.add_ne_constraint(0, 1)
+    csp.set_domain(0, {1})
+    csp.set_domain(1, {1})
+    csp.set_domain(2, {1, 2})
+    assert solve(SolverType.FC, csp) == ([], 1)
+    assert csp.get_domain(1) == {1}
+
+
+def test_maintaining_arc_consistency():
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        for gen in (sudoku_csp_3, sudoku_csp_5):
+            csp = gen(network)
+            before = [csp.get_domain(i) for i in range(81)]
+            sol, n_mac = solve(SolverType.MAC, csp)
+            assert csp.num_levels() == 0
+            assert [csp.get_domain(i) for i in range(81)] == before
+            sol_fc, n_fc = solve(SolverType.FC, csp)
+            assert sol == sol_fc
+            assert n_mac <= n_fc
+    # AC at the root already finds the conflict
+    csp = ConstraintNetwork(3)
+    csp.add_ne_constraint(1, 2)
+    csp.set_domain(0, {1, 2})
+    csp.set_domain(1, {1})
+    csp.set_domain(2, {1})
+    assert solve(SolverType.MAC, csp) == ([], 0)
+
+
+def test_nogood_store():
+    store = NogoodStore(2)
+    store.add([(3, 1), (0, 2)])
+    store.add([(1, 1), (2, 4)])
+    store.add([])
+    assert len(store) == 2
+    assert store.find([1, 5, 0, 1]) is None
+    assert store.find([2, 5, 0]) is None
+    assert store.find([2, 0, 0, 1]) == [0]
+    assert (store.hits, store.misses) == (1, 2)
+
+    # The nogood just found is used more recently, so the other one is evicted
+    store.add([(0, 1), (1, 1)])
+    assert len(store) == 2
+    assert store.find([2, 1, 4]) is None
+    assert store.find([1, 1]) == [0]
+    assert store.find([2, 1, 0, 1]) == [0]
+
+
+def test_cbj_nogoods():
+    for gen in (sudoku_csp_3, sudoku_csp_5):
+        sol, nodes = solve(SolverType.CBJ, gen())
+        for capacity in (10, 1000):
+            store = NogoodStore(capacity)
+            assert solve(SolverType.CBJ, gen(), nogoods=store)[0] == sol
+            assert len(store) <= capacity
+            assert store.hits > 0 and store.misses > 0
+        assert store.misses < nodes / 10
+
+    # Learnt nogoods never cut off the solution of a puzzle needing search
+    for c in ("0320200000010140", "3410020000200143"):
+        sol, nodes = solve(SolverType.CBJ, csp_from_4x4_str(c))
+        store = NogoodStore(5)
+        sol_learnt, nodes_learnt = solve(
+            SolverType.CBJ, csp_from_4x4_str(c), nogoods=store
+        )
+        assert sol_learnt == sol
+        assert nodes_learnt <= nodes
+
+
+def test_node_limit():
+    for st in (
+        SolverType.GTBT,
+        SolverType.BT,
+        SolverType.CBJ,
+        SolverType.BJ_IT,
+        SolverType.FC,
+        SolverType.MAC,
+    ):
+        csp = csp_from_4x4_str("3410020000200143")
+        sol, nodes = solve(st, csp)
+        assert solve(st, csp, max_nodes=nodes) == (sol, nodes)
+        assert solve(st, csp, max_nodes=nodes - 1) == (None, nodes - 1)
+        assert csp.num_levels() == 0
+    csp = sudoku_csp_5()
+    assert solve(SolverType.CBJ, csp, VariableOrdering.MRV, max_nodes=50) == (
+        None,
+        50,
+    )
+
+
+def test_restarts():
+    budgets = restart_budgets(RestartSchedule.LUBY, 10)
+    assert [next(budgets) for _ in range(7)] == [10, 10, 20, 10, 10, 20, 40]
+    budgets = restart_budgets(RestartSchedule.GEOMETRIC, 10, 1.5)
+    assert [next(budgets) for _ in range(4)] == [10, 15, 22, 33]
+
+    sol, _ = solve(SolverType.MAC, sudoku_csp_5())
+    for st, var_order in (
+        (SolverType.CBJ, VariableOrdering.MRV),
+        (SolverType.BJ, VariableOrdering.DOM_WDEG),
+        (SolverType.MAC, VariableOrdering.STATIC),
+        (SolverType.SAT, VariableOrdering.STATIC),
+    ):
+        for schedule in RestartSchedule:
+            result = solve_with_restarts(
+                st, sudoku_csp_5(), schedule, seed=1, var_order=var_order
+            )
+            assert result[0] == sol
+            # The same seed gives the same runs
+            assert result == solve_with_restarts(
+                st, sudoku_csp_5(), schedule, seed=1, var_order=var_order
+            )
+
+    # The node counts of all runs are summed, and a proof of unsatisfiability ends
+    # the restarts
+    csp = csp_from_4x4_str("1000010000000000")
+    sol, nodes = solve(SolverType.BT, csp)
+    assert sol == [] and nodes > 4
+    budgets = restart_budgets(RestartSchedule.LUBY, 2)
+    expected = 0
+    for budget in budgets:
+        if budget >= nodes:
+            break
+        expected += budget
+    assert solve_with_restarts(SolverType.BT, csp, base=2) == ([], expected + nodes)
+
+    # With static ordering only the order of the values is random, so on the
+    # empty board the first row is that order
+    csp = csp_from_4x4_str("0000000000000000")
+    sol, nodes = solve(SolverType.BT, csp)
+    assert sol[:4] == [1, 2, 3, 4]
+    sol, nodes_random = solve(SolverType.BT, csp, rng=random.Random(0))
+    assert sol[:4] == [3, 1, 2, 4]
+    assert csp.consistent_all(sol)
+    assert nodes_random == nodes
+
+
+def test_count_solutions():
+    # Every solver type goes on after a solution, backjumping over no level
+    # that may have more of them
+    for st in SolverType:
+        orders = [VariableOrdering.STATIC]
+        if st in (SolverType.BT, SolverType.BJ, SolverType.CBJ):
+            orders += [VariableOrdering.MRV, VariableOrdering.DOM_WDEG]
+        for order in orders:
+            csp = csp_from_4x4_str("3410020000200143")
+            assert count_solutions(st, csp, var_order=order)[0] == 1
+            if st in (SolverType.GTBT, SolverType.GTBT_IT):
+                continue
+            for c, expected in (
+                ("0000000000000000", 288),
+                ("3000000000000100", 12),
+                ("1000010000000000", 0),
+            ):
+                solutions = []
+                csp = csp_from_4x4_str(c)
+                count, _ = count_solutions(
+                    st, csp, var_order=order, solutions=solutions
+                )
+                assert count == len(solutions) == expected
+                assert len(set(map(tuple, solutions))) == expected
+                assert all(csp.consistent_all(sol) for sol in solutions)
+
+    # The search stops at the limit, 2 tells whether the solution is unique
+    csp = csp_from_4x4_str("0000000000000000")
+    _, nodes = solve(SolverType.BT, csp)
+    assert count_solutions(SolverType.BT, csp, 1) == (1, nodes)
+    assert count_solutions(SolverType.CBJ, csp, 5)[0] == 5
+    for st in (SolverType.FC, SolverType.MAC, SolverType.SAT):
+        assert count_solutions(st, sudoku_csp_5(), 2)[0] == 1
+
+
+def test_solve_with_budget():
+    sol, nodes = solve(SolverType.MAC, sudoku_csp_5())
+    assert solve_with_budget(SolverType.MAC, sudoku_csp_5()) == (
+        SolveStatus.SOLVED,
+        sol,
+        nodes,
+    )
+    csp = csp_from_4x4_str("1000010000000000")
+    assert solve_with_budget(SolverType.CBJ, csp)[:2] == (
+        SolveStatus.UNSATISFIABLE,
+        None,
+    )
+
+    # Every solver type checks the limits from the first node on
+    cancelled = CancellationToken()
+    cancelled.cancel()
+    for st in SolverType:
+        assert solve_with_budget(st, sudoku_csp_5(), timeout=0) == (
+            SolveStatus.BUDGET_EXHAUSTED,
+            None,
+            0,
+        )
+        assert solve_with_budget(st, sudoku_csp_5(), token=cancelled) == (
+            SolveStatus.CANCELLED,
+            None,
+            0,
+        )
+        if st != SolverType.SAT:
+            assert solve_with_budget(st, sudoku_csp_5(), max_nodes=10) == (
+                SolveStatus.BUDGET_EXHAUSTED,
+                None,
+                10,
+            )
+    for order in (VariableOrdering.MRV, VariableOrdering.DOM_WDEG):
+        status, _, _ = solve_with_budget(
+            SolverType.CBJ, sudoku_csp_5(), timeout=0, var_order=order
+        )
+        assert status == SolveStatus.BUDGET_EXHAUSTED
+
+    # Generate-and-test would run for hours on the empty board
+    empty = csp_from_4x4_str("0" * 16)
+    start = time.perf_counter()
+    status, _, nodes = solve_with_budget(SolverType.GTBT, empty, timeout=0.05)
+    assert status == SolveStatus.BUDGET_EXHAUSTED and nodes > 0
+    assert time.perf_counter() - start < 1
+
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    status, _, nodes = solve_with_budget(SolverType.GTBT_IT, empty, token=token)
+    assert status == SolveStatus.CANCELLED and nodes > 0
+
+    if hasattr(signal, 'setitimer'):
+        token = CancellationToken()
+        handler = signal.signal(signal.SIGALRM, lambda *_: token.cancel())
+        signal.setitimer(signal.ITIMER_REAL, 0.05)
+        status, _, _ = solve_with_budget(SolverType.GTBT, empty, token=token)
+        signal.signal(signal.SIGALRM, handler)
+        assert status == SolveStatus.CANCELLED
+
+    # The deadline covers all runs of the restarts
+    start = time.perf_counter()
+    sol, _ = solve_with_restarts(SolverType.GTBT, empty, timeout=0.05)
+    assert sol is None and time.perf_counter() - start < 1
+
+
+def test_solve_steps():
+    csp = csp_from_4x4_str("3000000000000100")
+    for st in (SolverType.BT, SolverType.BJ, SolverType.CBJ):
+        sol, nodes = solve(ITERATIVE_SOLVER_TYPES[st], csp)
+        snapshots = list(solve_steps(st, csp, 10))
+        assert [s.nodes for s in snapshots[:-1]] == list(range(1, nodes, 10))
+        assert all(s.status is None for s in snapshots[:-1])
+        assert all(s.depth == len(s.assignment) for s in snapshots)
+        assert snapshots[-1] == (16, sol, nodes, SolveStatus.SOLVED)
+
+    # Searches are resumed where they paused, so they can be interleaved
+    searches = {
+        0: solve_steps(SolverType.CBJ, sudoku_csp_3(), 1000),
+        1: solve_steps(SolverType.BT_IT, csp_from_4x4_str("1000010000000000"), 7),
+        2: solve_steps(SolverType.BJ, sudoku_csp_3(), 500, max_nodes=2000),
+    }
+    done = {}
+    while len(done) < len(searches):
+        for k, search in searches.items():
+            if k not in done:
+                snapshot = next(search)
+                if snapshot.status is not None:
+                    done[k] = snapshot
+    assert done[0] == (81, list(map(int, x3)), 34729, SolveStatus.SOLVED)
+    assert done[1] == (0, None, 29, SolveStatus.UNSATISFIABLE)
+    assert done[2] == (0, None, 2000, SolveStatus.BUDGET_EXHAUSTED)
+
+
+def test_dynamic_variable_ordering():
+    # The depth based solvers expand the same nodes as the index based ones in
+    # index order
+    for st in (SolverType.BT, SolverType.BJ, SolverType.CBJ):
+        csp = sudoku_csp_5()
+        make_arc_consistent(csp)
+        assert solve_dynamic_order(st, csp, VariableOrdering.STATIC) == solve(st, csp)
+        for c in ("0320200000010140", "3410020000200143"):
+            csp = csp_from_4x4_str(c)
+            assert solve_dynamic_order(st, csp, VariableOrdering.STATIC) == solve(
+                st, csp
+            )
+
+    _, n_static = solve(SolverType.CBJ, sudoku_csp_3())
+    csp = sudoku_csp_4()
+    for order in (
+        VariableOrdering.MRV,
+        VariableOrdering.MRV_DEGREE,
+        VariableOrdering.DOM_WDEG,
+    ):
+        for st in (SolverType.BT, SolverType.BJ, SolverType.CBJ):
+            sol, n = solve(st, sudoku_csp_3(), order)
+            assert sol == list(map(int, x3))
+            assert n < n_static
+        sol, _ = solve(SolverType.CBJ, csp, order)
+        assert all(sol[i] in csp.get_domain(i) for i in range(81))
+        assert all(sol[i] != sol[j] for i, j in csp.get_constraints())
+    assert solve(SolverType.CBJ, csp, VariableOrdering.DOM_WDEG)[1] == 1373
+
+
+def test_least_constraining_value():
+    lcv = ValueOrdering.LCV
+    sol, n = solve(SolverType.CBJ, sudoku_csp_3(), VariableOrdering.STATIC, lcv)
+    assert sol == list(map(int, x3))
+    assert n == 28092
+    sol, n = solve(SolverType.BJ, sudoku_csp_5(), VariableOrdering.MRV_DEGREE, lcv)
+    assert n == 92
+    assert sol == solve(SolverType.BJ, sudoku_csp_5(), VariableOrdering.MRV)[0]
+
+
 x3 = "359168274418273569762549318591482736837651492246937851625314987184795623973826145"
 
 
@@ -0,0 +1,64 @@
+import pathlib
+from src.strategies import apply_strategies, StrategyEngine, RULES
+from src.constraintnetwork import ConstraintNetwork, BitsetConstraintNetwork
+from src.solvers import SolverType, solve
+from .utils import (
+    get_all_from_file,
+    gen_csp_from_board,
+    sudoku_csp_3,
+    sudoku_csp_4,
+)
+
+
+def test_easy_puzzles():
+    puzzle_path = pathlib.Path(__file__).parent.parent.joinpath("src", "puzzles")
+    puzzles = get_all_from_file("sudoku_easy.txt", puzzle_path)
+    solved = 0
+    for board in puzzles:
+        csp = gen_csp_from_board(board)
+        consistent, fired = apply_strategies(csp)
+        assert consistent
+        assert set(fired) == set(RULES)
+        if all(csp.domain_size(i) == 1 for i in range(81)):
+            solved += 1
+            sol = [csp.get_sorted_domain(i)[0] for i in range(81)]
+            assert csp.consistent_all(sol)
+            assert solve(SolverType.BT, csp) == (sol, 81)
+    assert solved >= len(puzzles) - 1
+
+
+def test_rules_fired():
+    csp = sudoku_csp_3()
+    consistent, fired = apply_strategies(csp)
+    assert consistent
+    assert all(csp.domain_size(i) == 1 for i in range(81))
+    assert fired['naked single'] > 0
+    assert sum(fired.values()) > 0
+
+    # The hard one needs search, but the rules keep every solution value
+    sol, _ = solve(SolverType.MAC, sudoku_csp_4())
+    for network in (ConstraintNetwork, BitsetConstraintNetwork):
+        csp = sudoku_csp_4(network)
+        csp.push_level()
+        consistent, fired = apply_strategies(csp, trail=True)
+        assert consistent
+        assert all(sol[i] in csp.get_domain(i) for i in range(81))
+        assert sum(csp.domain_size(i) for i in range(81)) < 81 * 4
+        csp.pop_level()
+        assert csp.domain_size(1) == 9
+
+
+def test_engine_counts_and_contradiction():
+    board = [0] * 81
+    board[0] = 1
+    engine = StrategyEngine(gen_csp_from_board(board))
+    assert engine.counts[0][1] == 9 and engine.counts[0][2] == 8
+    assert engine.run()
+    # 1 is placed in row 0, column 0 and box 0 and removed from the other cells
+    assert engine.counts[0][1] == engine.counts[9][1] == engine.counts[18][1] == 1
+    assert engine.counts[1][1] == 6
+
+    # Two 1s in the first row
+    board[1] = 1
+    consistent, _ = apply_strategies(gen_csp_from_board(board))
+    assert not consistent
@@ -1,4 +1,9 @@
-from src.sudoku import generate_constraints, generate_domains_single, generate_domains
+from src.sudoku import (
+    generate_constraints,
+    generate_domains_single,
+    generate_domains,
+    generate_cover_rows,
+)
 from .utils import ALL_CONSTRAINTS
 
 
@@ -8,6 +13,16 @@ def test_generate_constraints():
     assert set(c) == ALL_CONSTRAINTS
 
 
+def test_generate_constraints_alldiff():
+    units = generate_constraints(alldiff=True)
+    assert len(units) == 27
+    assert units[0] == tuple(range(9))
+    assert units[9] == tuple(range(0, 81, 9))
+    assert units[26] == (60, 61, 62, 69, 70, 71, 78, 79, 80)
+    pairs = {(a, b) for u in units for a in u for b in u if a < b}
+    assert pairs == ALL_CONSTRAINTS
+
+
 def test_generate_domains_single():
     inp = [
         4,
@@ -516,3 +531,12 @@ def test_generate_domains():
         ],
     ]
     assert generate_domains(inp) == expected
+
+
+def test_generate_cover_rows():
+    rows = generate_cover_rows([0] * 81)
+    assert len(rows) == 729
+    assert all(len(set(columns)) == 4 for _, _, columns in rows)
+    for k in range(324):
+        assert sum(k in columns for _, _, columns in rows) == 9
+    assert generate_cover_rows([5] + [0] * 80)[0] == (0, 5, (0, 85, 166, 247))
@@ -879,24 +879,27 @@ ALL_CONSTRAINTS_4X4 = [
 ]
 
 
-def gen_csp_from_board(board):
+def gen_csp_from_board(board, network=ConstraintNetwork, alldiff=False):
     assert len(board) == 81
     doms = generate_domains_single(board)
-    constraints = generate_constraints()
-    csp = ConstraintNetwork(len(board))
-    for c_1, c_2 in constraints:
-        csp.add_ne_constraint(c_1, c_2)
+    constraints = generate_constraints(alldiff)
+    csp = network(len(board))
+    for c in constraints:
+        if alldiff:
+            csp.add_alldiff_constraint(c)
+        else:
+            csp.add_ne_constraint(*c)
     for i, dom in enumerate(doms):
         csp.set_domain(i, dom)
     return csp
 
 
-def gen_csp_from_str(s):
+def gen_csp_from_str(s, network=ConstraintNetwork, alldiff=False):
     board = list(map(int, s.replace("\n", "").replace(".", "0")))
-    return gen_csp_from_board(board)
+    return gen_csp_from_board(board, network, alldiff)
 
 
-sudoku_csp_1 = lambda: gen_csp_from_str(
+sudoku_csp_1 = lambda network=ConstraintNetwork, alldiff=False: gen_csp_from_str(
     """427568193
 683197524
 915342867
@@ -905,9 +908,11 @@ sudoku_csp_1 = lambda: gen_csp_from_str(
 7..2..35.
 349851276
 871926435
-256473981"""
+256473981""",
+    network,
+    alldiff,
 )
-sudoku_csp_2 = lambda: gen_csp_from_str(
+sudoku_csp_2 = lambda network=ConstraintNetwork, alldiff=False: gen_csp_from_str(
     """.6....91.
 2.3.1568.
 ...6.3254
@@ -916,9 +921,11 @@ sudoku_csp_2 = lambda: gen_csp_from_str(
 ...2..89.
 ..6..2.79
 4.7.9..62
-9127..5.."""
+9127..5..""",
+    network,
+    alldiff,
 )
-sudoku_csp_3 = lambda: gen_csp_from_str(
+sudoku_csp_3 = lambda network=ConstraintNetwork, alldiff=False: gen_csp_from_str(
     """3...682..
 41.27.5.9
 ....4.318
@@ -927,10 +934,12 @@ sudoku_csp_3 = lambda: gen_csp_from_str(
 ......851
 625.1....
 1.4.95.23
-..382...5"""
+..382...5""",
+    network,
+    alldiff,
 )
 
-sudoku_csp_4 = lambda: gen_csp_from_str(
+sudoku_csp_4 = lambda network=ConstraintNetwork, alldiff=False: gen_csp_from_str(
     """3...8....
 ...7....5
 1........
@@ -939,10 +948,12 @@ sudoku_csp_4 = lambda: gen_csp_from_str(
 .7.......
 ....6.13.
 .452.....
-......8.."""
+......8..""",
+    network,
+    alldiff,
 )
 
-sudoku_csp_5 = lambda: gen_csp_from_str(
+sudoku_csp_5 = lambda network=ConstraintNetwork, alldiff=False: gen_csp_from_str(
     """.3..5..4.
 ..8.1.5..
 46.....12
@@ -951,7 +962,9 @@ sudoku_csp_5 = lambda: gen_csp_from_str(
 .4.1.9.3.
 25.....98
 ..1.2.6..
-.8..6..2."""
+.8..6..2.""",
+    network,
+    alldiff,
 )
 
 
@@ -982,8 +995,8 @@ def sud_4x4_to_domains(board):
     return [{x} if x else {1, 2, 3, 4} for x in board]
 
 
-def csp_from_4x4_str(string):
-    csp = ConstraintNetwork(16)
+def csp_from_4x4_str(string, network=ConstraintNetwork):
+    csp = network(16)
     for i, d in enumerate(sud_4x4_to_domains(map(int, string))):
         csp.set_domain(i, d)
     for i, j in ALL_CONSTRAINTS_4X4: